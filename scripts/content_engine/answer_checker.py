@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Answer Checker - Grade free-form derivative answers over HTTP.
+
+Usage:
+    python answer_checker.py
+    python answer_checker.py --port 8787 --questions-file questions.json
+
+POST /check with {"question_id": "...", "answer": "2*x*cos(x^2)"} returns
+{"question_id": "...", "correct": true}. User input never reaches eval or
+sympify: it is parsed with a whitelisting AST walker and evaluated directly
+with NumPy. Reference answers are lambdified once and kept in an LRU cache.
+"""
+
+import argparse
+import ast
+import json
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import sympy as sp
+from dotenv import load_dotenv
+from sympy.core.function import AppliedUndef
+
+
+MAX_ANSWER_LENGTH = 200
+MAX_AST_NODES = 120
+MAX_CONSTANT = 1e6
+MAX_EXPONENT = 100
+MIN_VALID_POINTS = 8
+
+# Symmetric around 0 (which is skipped), so answers that only agree for x > 0,
+# such as 1/abs(x) against 1/x, are caught. Points where the reference is
+# undefined (log, sqrt of negatives) are masked out in check().
+_POSITIVE_POINTS = np.linspace(0.17, 2.93, 32)
+SAMPLE_POINTS = np.concatenate([-_POSITIVE_POINTS[::-1], _POSITIVE_POINTS])
+
+FUNCTIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'sec': lambda v: 1 / np.cos(v), 'csc': lambda v: 1 / np.sin(v), 'cot': lambda v: 1 / np.tan(v),
+    'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan,
+    'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+    'exp': np.exp, 'log': np.log, 'ln': np.log, 'sqrt': np.sqrt, 'abs': np.abs,
+}
+
+CONSTANTS = {'pi': np.pi, 'e': np.e, 'E': np.e}
+
+# A numeric literal, including scientific notation (1e-3, 2.5E4). The lookahead
+# stops a shorter match inside a longer literal, e.g. "1" in "1e-3".
+NUMBER = r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?(?![\d.]|[eE][+-]?\d)'
+
+BINARY_OPS = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+    ast.Div: np.divide, ast.Pow: np.power,
+}
+
+
+class AnswerParseError(ValueError):
+    """Raised when user input is not an acceptable expression."""
+
+
+class ReferenceAnswerError(Exception):
+    """Raised when a stored question has no usable reference answer."""
+
+
+def _normalize(text: str) -> str:
+    """Rewrite common calculator notation into Python expression syntax."""
+    text = text.strip().replace('^', '**').replace('·', '*').replace('×', '*').replace('−', '-')
+    text = re.sub(rf'({NUMBER})\s*([a-zA-Z(])', r'\1*\2', text)  # 2x, 3(x+1), 1e-3 x
+    text = re.sub(r'\)\s*([a-zA-Z0-9(])', r')*\1', text)       # (x+1)(x-1), (x+1)x
+    text = re.sub(r'\bx\s*([(0-9])', r'x*\1', text)             # x(x+1)
+    text = re.sub(r'([\w)])\s+(?=[\w(])', r'\1*', text)          # 2x cos(x)
+    return text
+
+
+def parse_answer(text: str) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Parse a user-typed expression in x into a vectorized NumPy function.
+    Only arithmetic, x, a few constants and whitelisted functions are allowed.
+    """
+    if not isinstance(text, str) or not text.strip():
+        raise AnswerParseError("Answer must be a non-empty string")
+    if len(text) > MAX_ANSWER_LENGTH:
+        raise AnswerParseError(f"Answer is longer than {MAX_ANSWER_LENGTH} characters")
+
+    try:
+        tree = ast.parse(_normalize(text), mode='eval')
+    except SyntaxError:
+        raise AnswerParseError("Answer is not a valid expression")
+
+    if sum(1 for _ in ast.walk(tree)) > MAX_AST_NODES:
+        raise AnswerParseError("Answer is too complex")
+
+    return _compile(tree.body)
+
+
+def _compile(node: ast.AST) -> Callable[[np.ndarray], np.ndarray]:
+    """Turn a whitelisted AST node into a closure over the sample array."""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        if abs(node.value) > MAX_CONSTANT:
+            raise AnswerParseError("Numeric constant is too large")
+        value = float(node.value)
+        return lambda xs: np.full_like(xs, value)
+
+    if isinstance(node, ast.Name):
+        if node.id == 'x':
+            return lambda xs: xs
+        if node.id in CONSTANTS:
+            value = CONSTANTS[node.id]
+            return lambda xs: np.full_like(xs, value)
+        raise AnswerParseError(f"Unknown name: {node.id}")
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _compile(node.operand)
+        if isinstance(node.op, ast.USub):
+            return lambda xs: -operand(xs)
+        return operand
+
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+        if isinstance(node.op, ast.Pow):
+            exponent = node.right
+            if isinstance(exponent, ast.UnaryOp) and isinstance(exponent.op, (ast.USub, ast.UAdd)):
+                exponent = exponent.operand
+            if (isinstance(exponent, ast.Constant) and type(exponent.value) in (int, float)
+                    and abs(exponent.value) > MAX_EXPONENT):
+                raise AnswerParseError("Exponent is too large")
+        op = BINARY_OPS[type(node.op)]
+        left, right = _compile(node.left), _compile(node.right)
+        return lambda xs: op(left(xs), right(xs))
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise AnswerParseError("Unknown function")
+        if len(node.args) != 1 or node.keywords:
+            raise AnswerParseError(f"{node.func.id} takes exactly one argument")
+        func, arg = FUNCTIONS[node.func.id], _compile(node.args[0])
+        return lambda xs: func(arg(xs))
+
+    raise AnswerParseError("Unsupported syntax in answer")
+
+
+def latex_to_expr(latex: str, x: sp.Symbol) -> sp.Expr:
+    """
+    Parse the LaTeX of a generated option back into SymPy.
+    parse_latex reads e and pi as plain symbols and "x \\left(...\\right)" as a
+    call to a function x, so both are rewritten. Needs antlr4-python3-runtime.
+    """
+    from sympy.parsing.latex import parse_latex
+
+    expr = parse_latex(latex.strip().strip('$')).subs({sp.Symbol('e'): sp.E, sp.Symbol('pi'): sp.pi})
+    expr = expr.replace(
+        lambda node: isinstance(node, AppliedUndef) and node.func.__name__ == 'x' and len(node.args) == 1,
+        lambda node: x * node.args[0]
+    ).doit()
+    if expr.free_symbols - {x}:
+        raise ValueError(f"Unexpected symbols in {latex!r}: {expr.free_symbols - {x}}")
+    return expr
+
+
+class CompiledAnswerCache:
+    """
+    Thread-safe LRU of reference answers, stored as the lambdified
+    derivative together with its values at SAMPLE_POINTS.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, question_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(question_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(question_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, question_id: str, func: Callable, values: np.ndarray):
+        with self._lock:
+            self._entries[question_id] = (func, values)
+            self._entries.move_to_end(question_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'size': len(self._entries), 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class SupabaseQuestionSource:
+    """Loads question content from the questions table."""
+
+    def __init__(self):
+        from uploader import SupabaseUploader
+        self.client = SupabaseUploader().client
+
+    def get_content(self, question_id: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table('questions').select('content').eq('id', question_id).limit(1).execute()
+        return response.data[0]['content'] if response.data else None
+
+
+class FileQuestionSource:
+    """Loads question content from a JSON list of {"id", "content"} rows."""
+
+    def __init__(self, path: str = None, rows: List[Dict[str, Any]] = None):
+        if rows is None:
+            with open(path) as f:
+                rows = json.load(f)
+        self.contents = {str(row['id']): row['content'] for row in rows}
+
+    def get_content(self, question_id: str) -> Optional[Dict[str, Any]]:
+        return self.contents.get(question_id)
+
+
+class AnswerChecker:
+    """Grades free-form answers by numeric equivalence with the stored derivative."""
+
+    def __init__(self, source, cache_size: int = 4096, rtol: float = 1e-6, atol: float = 1e-8):
+        self.source = source
+        self.cache = CompiledAnswerCache(cache_size)
+        self.rtol = rtol
+        self.atol = atol
+        self.x = sp.symbols('x')
+
+    def _reference_expr(self, content: Dict[str, Any]) -> sp.Expr:
+        """
+        Stored SymPy answer, falling back to the LaTeX of the correct option.
+        Raises ReferenceAnswerError if the content has neither.
+        """
+        if not isinstance(content, dict):
+            raise ReferenceAnswerError("question content is not an object")
+
+        if content.get('answer_expr'):
+            try:
+                return sp.sympify(content['answer_expr'], locals={'x': self.x})
+            except (sp.SympifyError, TypeError) as e:
+                raise ReferenceAnswerError(f"answer_expr does not parse: {e}")
+
+        # Questions generated before answer_expr was stored (see backfill_answer_expr.py)
+        options = content.get('options')
+        if not isinstance(options, list):
+            raise ReferenceAnswerError("question has neither answer_expr nor options")
+        correct = next((opt for opt in options if isinstance(opt, dict) and opt.get('is_correct')), None)
+        if correct is None or not correct.get('latex'):
+            raise ReferenceAnswerError("no option is marked correct with LaTeX")
+        try:
+            return latex_to_expr(correct['latex'], self.x)
+        except Exception as e:
+            raise ReferenceAnswerError(f"correct option LaTeX does not parse: {e}")
+
+    def _reference_values(self, question_id: str) -> Optional[np.ndarray]:
+        values = self.cache.get(question_id)
+        if values is not None:
+            return values
+
+        content = self.source.get_content(question_id)
+        if content is None:
+            return None
+
+        func = sp.lambdify(self.x, self._reference_expr(content), modules='numpy')
+        with np.errstate(all='ignore'):
+            values = np.broadcast_to(np.asarray(func(SAMPLE_POINTS), dtype=float), SAMPLE_POINTS.shape)
+        self.cache.put(question_id, func, values)
+        return values
+
+    def check(self, question_id: str, answer: str) -> Dict[str, Any]:
+        """
+        Grade an answer. Raises AnswerParseError for unacceptable input,
+        KeyError for unknown questions and ReferenceAnswerError when the stored
+        question cannot be graded.
+        """
+        user_func = parse_answer(answer)
+
+        expected = self._reference_values(question_id)
+        if expected is None:
+            raise KeyError(question_id)
+
+        with np.errstate(all='ignore'):
+            actual = np.asarray(user_func(SAMPLE_POINTS), dtype=float)
+
+        defined = np.isfinite(expected)
+        if defined.sum() < MIN_VALID_POINTS:
+            return {'question_id': question_id, 'correct': False, 'reason': 'reference answer undefined at sample points'}
+
+        correct = bool(np.all(np.isfinite(actual[defined])) and
+                       np.allclose(actual[defined], expected[defined], rtol=self.rtol, atol=self.atol))
+        return {'question_id': question_id, 'correct': correct}
+
+
+class AnswerCheckHandler(BaseHTTPRequestHandler):
+    """HTTP front-end: POST /check, GET /health."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    checker: AnswerChecker = None
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'cache': self.checker.cache.stats()})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _reject_unread(self, status: int, body: Dict[str, Any]):
+        """Reply without reading the request body, so the connection can't be reused."""
+        self.close_connection = True
+        self._send_json(status, body)
+
+    def do_POST(self):
+        if self.path != '/check':
+            self._reject_unread(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self._reject_unread(400, {'error': 'invalid Content-Length'})
+            return
+        if length > 4096:
+            self._reject_unread(413, {'error': 'request body too large'})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            question_id, answer = str(body['question_id']), body['answer']
+        except (KeyError, TypeError, ValueError):
+            self._send_json(400, {'error': 'expected JSON body with question_id and answer'})
+            return
+
+        try:
+            result = self.checker.check(question_id, answer)
+        except KeyError:
+            self._send_json(404, {'error': f"unknown question: {question_id}"})
+            return
+        except AnswerParseError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except ReferenceAnswerError as e:
+            self._send_json(500, {'error': f"question {question_id} has a broken reference answer: {e}"})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': f"grading failed: {e}"})
+            return
+
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(checker: AnswerChecker, host: str = '127.0.0.1', port: int = 8787) -> ThreadingHTTPServer:
+    """Build a threaded HTTP server bound to the given checker."""
+    handler = type('BoundAnswerCheckHandler', (AnswerCheckHandler,), {'checker': checker})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Serve free-form answer checking over HTTP')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8787, help='Port (default: 8787)')
+    parser.add_argument('--cache-size', type=int, default=4096, help='Compiled answers kept in the LRU (default: 4096)')
+    parser.add_argument(
+        '--questions-file',
+        type=str,
+        help='Serve questions from a JSON file of {"id", "content"} rows instead of Supabase'
+    )
+    args = parser.parse_args()
+
+    source = FileQuestionSource(args.questions_file) if args.questions_file else SupabaseQuestionSource()
+    server = create_server(AnswerChecker(source, cache_size=args.cache_size), args.host, args.port)
+
+    print(f"Answer checker listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
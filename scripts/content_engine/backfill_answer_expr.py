@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Backfill content.answer_expr for questions generated before it was stored.
+
+Usage:
+    python backfill_answer_expr.py --dry-run
+    python backfill_answer_expr.py
+
+The answer checker grades against answer_expr. Older rows only have the
+LaTeX of their options, so the correct option is parsed once here (this
+needs antlr4-python3-runtime) instead of on every cold cache miss.
+"""
+
+import argparse
+import time
+
+import sympy as sp
+from dotenv import load_dotenv
+
+from answer_checker import latex_to_expr
+
+
+def backfill(client, page_size: int = 500, dry_run: bool = False) -> dict:
+    """Walk questions in id order and write answer_expr where it is missing."""
+    x = sp.symbols('x')
+    counts = {'scanned': 0, 'updated': 0, 'failed': 0}
+    last_id = None
+
+    while True:
+        query = client.table('questions').select('id, content')
+        if last_id:
+            query = query.gt('id', last_id)
+        page = query.order('id').limit(page_size).execute().data
+        if not page:
+            break
+
+        for row in page:
+            counts['scanned'] += 1
+            content = row['content'] or {}
+            if content.get('answer_expr'):
+                continue
+
+            try:
+                correct = next(opt for opt in content['options'] if opt['is_correct'])
+                content['answer_expr'] = str(latex_to_expr(correct['latex'], x))
+            except Exception as e:
+                counts['failed'] += 1
+                print(f"✗ {row['id']}: {e}")
+                continue
+
+            if not dry_run:
+                client.table('questions').update({'content': content}).eq('id', row['id']).execute()
+            counts['updated'] += 1
+
+        last_id = page[-1]['id']
+        if len(page) < page_size:
+            break
+
+    return counts
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Store answer_expr on questions generated before it existed')
+    parser.add_argument('--page-size', type=int, default=500, help='Rows per page (default: 500)')
+    parser.add_argument('--dry-run', action='store_true', help='Parse and report without writing')
+    args = parser.parse_args()
+
+    from uploader import SupabaseUploader
+
+    print("=" * 60)
+    print(f"ANSWER_EXPR BACKFILL{' (dry run)' if args.dry_run else ''}")
+    print("=" * 60)
+
+    start_time = time.time()
+    counts = backfill(SupabaseUploader().client, args.page_size, args.dry_run)
+
+    print(f"\n✓ Scanned {counts['scanned']}, updated {counts['updated']}, failed {counts['failed']}")
+    print(f"  Time: {time.time() - start_time:.2f}s")
+    if counts['updated'] and not args.dry_run:
+        print("  Run `python bundle_builder.py` to republish the updated question bundles")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
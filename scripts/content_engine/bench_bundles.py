@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Bundle Bench - Compare one-shot bundle loads with paginated selects.
+
+Usage:
+    python bench_bundles.py
+    python bench_bundles.py --questions 2000 --page-size 50 --latency-ms 30
+
+A local HTTP server stands in for both PostgREST (paginated
+/rest/v1/questions?topic_id=eq.X&offset=N&limit=M) and the bundle host
+(manifest + content-addressed gzip bundle with ETag revalidation). Each
+request is delayed by --latency-ms to model a network round trip.
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from bundle_builder import build_bundle, read_question
+
+
+def build_rows(count: int, distinct: int = 48) -> List[Dict[str, Any]]:
+    """Question rows shaped like the questions table, cycling a pool of generated content."""
+    from template_fast_generator import TemplateFastGenerator
+
+    generator = TemplateFastGenerator()
+    topics = ["Product Rule", "Quotient Rule", "Basic Derivatives"]
+    pool = [generator.generate_question(topics[i % len(topics)], variation=i) for i in range(min(count, distinct))]
+    rows = []
+    for i in range(count):
+        content = pool[i % len(pool)]
+        rows.append({
+            'id': str(uuid.uuid4()),
+            'topic_id': 'bench-topic',
+            'content': content,
+            'hints': None,
+            'full_solution': {'steps': content['solution_steps']},
+            'difficulty_level': 1,
+            'times_shown': 0,
+            'times_correct': 0,
+            'updated_at': '2026-01-01T00:00:00+00:00'
+        })
+    generator.watchdog.close()
+    return sorted(rows, key=lambda r: r['id'])
+
+
+def make_handler(rows: List[Dict[str, Any]], bundle_dir: str, latency: float):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _send(self, status: int, body: bytes, headers: Dict[str, str] = None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+
+            if url.path == '/rest/v1/questions':
+                query = parse_qs(url.query)
+                offset, limit = int(query['offset'][0]), int(query['limit'][0])
+                # Serialized per request, as PostgREST does
+                body = json.dumps(rows[offset:offset + limit]).encode()
+                self._send(200, body, {'Content-Type': 'application/json'})
+                return
+
+            if url.path.startswith('/bundles/'):
+                path = os.path.join(bundle_dir, url.path[len('/bundles/'):])
+                if not os.path.isfile(path):
+                    self._send(404, b'')
+                    return
+                with open(path, 'rb') as f:
+                    body = f.read()
+                if path.endswith('.json.gz'):
+                    etag = '"' + os.path.basename(path).split('.')[0] + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        self._send(304, b'', {'ETag': etag})
+                        return
+                    self._send(200, body, {'ETag': etag, 'Content-Type': 'application/gzip'})
+                else:
+                    self._send(200, body, {'Content-Type': 'application/json'})
+                return
+
+            self._send(404, b'')
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+def load_paginated(conn: http.client.HTTPConnection, page_size: int) -> List[Dict[str, Any]]:
+    """Fetch a topic page by page, like the current clients' select() calls."""
+    questions, offset = [], 0
+    while True:
+        conn.request('GET', f"/rest/v1/questions?topic_id=eq.bench-topic&offset={offset}&limit={page_size}")
+        page = json.loads(conn.getresponse().read())
+        questions.extend(page)
+        if len(page) < page_size:
+            return questions
+        offset += page_size
+
+
+def load_bundle(conn: http.client.HTTPConnection, slug: str, cached: Dict[str, Any] = None):
+    """Fetch manifest + bundle; revalidate with If-None-Match when cached."""
+    conn.request('GET', f"/bundles/{slug}/manifest.json")
+    manifest = json.loads(conn.getresponse().read())
+
+    headers = {'If-None-Match': cached['etag']} if cached else {}
+    conn.request('GET', f"/bundles/{slug}/{manifest['bundle']}", headers=headers)
+    response = conn.getresponse()
+    body = response.read()
+
+    if response.status == 304:
+        return manifest, cached['payload']
+    return manifest, gzip.decompress(body)
+
+
+def timed(func, repeats: int) -> List[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bundle loads against paginated selects')
+    parser.add_argument('--questions', type=int, default=1000, help='Questions in the topic (default: 1000)')
+    parser.add_argument('--page-size', type=int, default=50, help='Rows per paginated select (default: 50)')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated round trip per request (default: 20)')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per strategy (default: 5)')
+    args = parser.parse_args()
+
+    print(f"Generating {args.questions} questions...")
+    rows = build_rows(args.questions)
+
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        topic = {'id': 'bench-topic', 'name': 'Chain Rule', 'slug': 'chain-rule'}
+        manifest = build_bundle(topic, rows, bundle_dir)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(rows, bundle_dir, args.latency_ms / 1000))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        conn = http.client.HTTPConnection(*server.server_address[:2])
+
+        paginated = timed(lambda: load_paginated(conn, args.page_size), args.repeats)
+        cold = timed(lambda: load_bundle(conn, 'chain-rule'), args.repeats)
+
+        _, payload = load_bundle(conn, 'chain-rule')
+        cache = {'etag': manifest['etag'], 'payload': payload}
+        warm = timed(lambda: load_bundle(conn, 'chain-rule', cache), args.repeats)
+
+        entries = manifest['questions']
+        start = time.perf_counter()
+        for entry in entries:
+            read_question(payload, entry)
+        random_access = (time.perf_counter() - start) / len(entries)
+
+        conn.close()
+        server.shutdown()
+        server.server_close()
+
+    pages = -(-args.questions // args.page_size) + (args.questions % args.page_size == 0)
+    print("\n" + "=" * 60)
+    print(f"BUNDLE BENCH - {args.questions} questions, {args.latency_ms:.0f}ms simulated latency")
+    print("=" * 60)
+    print(f"Bundle size: {manifest['size'] / 1024:.1f} KB raw, {manifest['compressed_size'] / 1024:.1f} KB gzip")
+    print(f"{f'Paginated select ({pages} requests):':<36}{statistics.median(paginated) * 1000:8.1f} ms")
+    print(f"{'Bundle, cold (2 requests):':<36}{statistics.median(cold) * 1000:8.1f} ms")
+    print(f"{'Bundle, ETag revalidated:':<36}{statistics.median(warm) * 1000:8.1f} ms")
+    print(f"{'Random access per question:':<36}{random_access * 1e6:8.1f} µs")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,11 +10,12 @@ Usage:
 import argparse
 import time
 from dotenv import load_dotenv
-from template_fast_generator import TemplateFastGenerator
-from uploader import SupabaseUploader
+from compute_budget import DEFAULT_QUESTION_TIMEOUT
+import daemon_client
 
 
-def generate_for_topic(topic: str, count: int, upload: bool = True):
+def generate_for_topic(topic: str, count: int, upload: bool = True,
+                       question_timeout: float = DEFAULT_QUESTION_TIMEOUT, bundles: bool = True):
     """Generate questions for a single topic"""
     print(f"\n{'='*60}")
     print(f"Generating {count} questions for: {topic}")
@@ -22,15 +23,23 @@ def generate_for_topic(topic: str, count: int, upload: bool = True):
     
     start_time = time.time()
     
+    # Heavy imports (Supabase client) are only paid when running locally
+    from template_fast_generator import TemplateFastGenerator
+    from uploader import SupabaseUploader
+    from bundle_builder import QuestionBundleBuilder
+    
     # Generate questions
-    generator = TemplateFastGenerator()
+    generator = TemplateFastGenerator(question_timeout=question_timeout)
     questions = generator.generate_batch(topic, count)
+    generator.watchdog.close()
     
     generation_time = time.time() - start_time
     questions_per_sec = len(questions) / generation_time if generation_time > 0 else 0
     
     print(f"\n✓ Generated {len(questions)} questions in {generation_time:.2f}s")
     print(f"  Speed: {questions_per_sec:.1f} questions/second")
+    if generator.watchdog.quarantine:
+        print(f"  Quarantined: {len(generator.watchdog.quarantine)} expressions (see quarantine.jsonl)")
     
     if not upload:
         print("\nSkipping upload (--no-upload flag)")
@@ -53,11 +62,41 @@ def generate_for_topic(topic: str, count: int, upload: bool = True):
         print(f"  - New count: {after_count}")
         print(f"  - Upload time: {upload_time:.2f}s")
         
-        return uploaded
-        
     except Exception as e:
         print(f"\n✗ Upload failed: {e}")
         return 0
+    
+    if bundles:
+        print(f"\nRebuilding question bundle...")
+        try:
+            QuestionBundleBuilder(uploader).rebuild([topic])
+        except Exception as e:
+            print(f"✗ Bundle rebuild failed: {e}")
+            print("  The questions were uploaded; rerun `python bundle_builder.py` to publish the bundle")
+    
+    return uploaded
+
+
+def generate_via_daemon(topics, count: int, upload: bool, question_timeout: float, bundles: bool) -> int:
+    """Queue one daemon job per topic and wait for all of them"""
+    print(f"Submitting to content engine daemon at {daemon_client.daemon_url()}...")
+    jobs = [
+        daemon_client.submit_job(topic, count, mode='template', upload=upload, bundles=bundles,
+                                 question_timeout=question_timeout)
+        for topic in topics
+    ]
+    
+    total = 0
+    for job in jobs:
+        print(f"\nJob {job['id']}: {count} questions for {job['topic']}")
+        job = daemon_client.wait_for_job(job['id'])
+        if job['status'] == 'completed':
+            print(f"✓ Generated {job['generated']}, uploaded {job['uploaded']}")
+            total += job['uploaded'] if upload else job['generated']
+        else:
+            print(f"✗ Job failed: {job['error']}")
+    
+    return total
 
 
 def main():
@@ -99,6 +138,25 @@ def main():
         help='Generate only, skip uploading to database'
     )
     
+    parser.add_argument(
+        '--no-bundles',
+        action='store_true',
+        help='Skip rebuilding per-topic question bundles after upload'
+    )
+    
+    parser.add_argument(
+        '--question-timeout',
+        type=float,
+        default=DEFAULT_QUESTION_TIMEOUT,
+        help=f'Wall-clock budget in seconds for each question\'s SymPy work (default: {DEFAULT_QUESTION_TIMEOUT})'
+    )
+    
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Run in this process even if the content engine daemon is running'
+    )
+    
     args = parser.parse_args()
     
     upload = not args.no_upload
@@ -120,21 +178,26 @@ def main():
             "Quotient Rule",
             "Basic Derivatives"
         ]
+        count = args.count_per_topic
         
         print(f"Generating {args.count_per_topic} questions for each of {len(topics)} topics")
         print(f"Total: {args.count_per_topic * len(topics)} questions\n")
-        
-        for topic in topics:
-            count = generate_for_topic(topic, args.count_per_topic, upload)
-            total_generated += count
     
     elif args.topic:
         # Generate for single topic
-        total_generated = generate_for_topic(args.topic, args.count, upload)
+        topics = [args.topic]
+        count = args.count
     
     else:
         parser.error("Must specify either --topic or --multiple")
     
+    if not args.no_daemon and daemon_client.daemon_available():
+        total_generated = generate_via_daemon(topics, count, upload, args.question_timeout, not args.no_bundles)
+    else:
+        for topic in topics:
+            total_generated += generate_for_topic(topic, count, upload, args.question_timeout,
+                                                  not args.no_bundles)
+    
     total_time = time.time() - total_start
     
     print("\n" + "="*60)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Bundle Builder - Precompute compressed per-topic question bundles.
+
+Usage:
+    python bundle_builder.py
+    python bundle_builder.py --topic "Chain Rule" --bucket question-bundles
+
+Each topic gets a content-addressed, gzip-compressed bundle of newline-delimited
+question JSON plus a manifest with the bundle version/ETag and per-question
+byte offsets into the decompressed payload. Clients fetch a whole topic in one
+cacheable request and random-access questions by offset. Topics are only
+rebuilt when their questions changed since the last manifest.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+
+DEFAULT_BUNDLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bundles')
+BUNDLE_FIELDS = ['id', 'content', 'hints', 'full_solution', 'difficulty_level']
+PAGE_SIZE = 1000
+
+# storage3 sends cache-control as "max-age={value}", so these are seconds.
+# Bundles are named by content hash and never change; manifests and the
+# index must be revalidated on every read.
+BUNDLE_MAX_AGE = '31536000'
+MANIFEST_MAX_AGE = '0'
+
+
+def source_fingerprint(rows: List[Dict[str, Any]]) -> str:
+    """Hash of (id, updated_at) pairs; changes whenever a topic's questions do."""
+    digest = hashlib.sha256()
+    for row in sorted(rows, key=lambda r: r['id']):
+        digest.update(f"{row['id']}:{row.get('updated_at')}\n".encode())
+    return digest.hexdigest()
+
+
+def build_bundle(topic: Dict[str, Any], rows: List[Dict[str, Any]], output_dir: str,
+                 fingerprint: Optional[str] = None, commit: bool = True) -> Dict[str, Any]:
+    """
+    Write {slug}/{version}.json.gz for one topic and return its manifest.
+    With commit=False the manifest is not written yet (see commit_manifest),
+    so the previous one stays current until the caller has published.
+    """
+    payload = bytearray()
+    entries = []
+    for row in sorted(rows, key=lambda r: r['id']):
+        record = json.dumps({field: row.get(field) for field in BUNDLE_FIELDS},
+                            separators=(',', ':'), sort_keys=True).encode() + b'\n'
+        entries.append({
+            'id': row['id'],
+            'offset': len(payload),
+            'length': len(record),
+            'difficulty_level': row.get('difficulty_level')
+        })
+        payload.extend(record)
+
+    version = hashlib.sha256(payload).hexdigest()[:16]
+    bundle_name = f"{version}.json.gz"
+    compressed = gzip.compress(bytes(payload), compresslevel=9, mtime=0)
+
+    topic_dir = os.path.join(output_dir, topic['slug'])
+    os.makedirs(topic_dir, exist_ok=True)
+    with open(os.path.join(topic_dir, bundle_name), 'wb') as f:
+        f.write(compressed)
+
+    manifest = {
+        'topic_id': topic['id'],
+        'topic_name': topic['name'],
+        'slug': topic['slug'],
+        'version': version,
+        'etag': f'"{version}"',
+        'bundle': bundle_name,
+        'encoding': 'gzip',
+        'size': len(payload),
+        'compressed_size': len(compressed),
+        'question_count': len(entries),
+        'source_fingerprint': fingerprint or source_fingerprint(rows),
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'questions': entries
+    }
+    if commit:
+        commit_manifest(manifest, output_dir)
+    return manifest
+
+
+def manifest_bytes(manifest: Dict[str, Any]) -> bytes:
+    return json.dumps(manifest, separators=(',', ':')).encode()
+
+
+def commit_manifest(manifest: Dict[str, Any], output_dir: str):
+    """Make a built bundle current: replace {slug}/manifest.json and drop superseded bundles."""
+    topic_dir = os.path.join(output_dir, manifest['slug'])
+    path = os.path.join(topic_dir, 'manifest.json')
+    with open(path + '.tmp', 'wb') as f:
+        f.write(manifest_bytes(manifest))
+    os.replace(path + '.tmp', path)
+
+    # Content addressing means the new bundle never collides with an old one
+    for name in os.listdir(topic_dir):
+        if name.endswith('.json.gz') and name != manifest['bundle']:
+            os.remove(os.path.join(topic_dir, name))
+
+
+def read_question(payload: bytes, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Random-access one question in a decompressed bundle payload."""
+    return json.loads(payload[entry['offset']:entry['offset'] + entry['length']])
+
+
+class QuestionBundleBuilder:
+    """
+    Rebuilds per-topic bundles from the questions table, skipping topics
+    whose questions have not changed since the last build.
+    """
+
+    def __init__(self, uploader, output_dir: str = DEFAULT_BUNDLE_DIR, bucket: Optional[str] = None):
+        self.uploader = uploader
+        self.client = uploader.client
+        self.output_dir = output_dir
+        self.bucket = bucket or os.getenv('QUESTION_BUNDLE_BUCKET')
+
+    def _paged(self, columns: str, topic_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield a topic's questions in id order, one keyset page at a time."""
+        last_id = None
+        while True:
+            query = self.client.table('questions').select(columns).eq('topic_id', topic_id)
+            if last_id:
+                query = query.gt('id', last_id)
+            rows = query.order('id').limit(PAGE_SIZE).execute().data
+            yield from rows
+            if len(rows) < PAGE_SIZE:
+                return
+            last_id = rows[-1]['id']
+
+    def _load_manifest(self, slug: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.output_dir, slug, 'manifest.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _publish(self, manifest: Dict[str, Any]):
+        """Upload bundle and manifest to Supabase Storage (the manifest last)."""
+        storage = self.client.storage.from_(self.bucket)
+        topic_dir = os.path.join(self.output_dir, manifest['slug'])
+
+        with open(os.path.join(topic_dir, manifest['bundle']), 'rb') as f:
+            storage.upload(f"{manifest['slug']}/{manifest['bundle']}", f.read(), {
+                'content-type': 'application/gzip',
+                'cache-control': BUNDLE_MAX_AGE,
+                'x-upsert': 'true'
+            })
+        storage.upload(f"{manifest['slug']}/manifest.json", manifest_bytes(manifest), {
+            'content-type': 'application/json',
+            'cache-control': MANIFEST_MAX_AGE,
+            'x-upsert': 'true'
+        })
+
+    def rebuild(self, topic_names: Optional[List[str]] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Rebuild bundles for the given topics (default: all topics).
+        Returns {slug: manifest} for the topics that were rebuilt.
+        """
+        topics = self.client.table('topics').select('id, name, slug').execute().data
+        if topic_names is not None:
+            slugs = {self.uploader._slugify(name) for name in topic_names}
+            topics = [topic for topic in topics if topic['slug'] in slugs]
+
+        rebuilt = {}
+        for topic in topics:
+            fingerprint = source_fingerprint(list(self._paged('id, updated_at', topic['id'])))
+            previous = self._load_manifest(topic['slug'])
+
+            if not force and previous and previous.get('source_fingerprint') == fingerprint:
+                print(f"= {topic['name']}: unchanged (version {previous['version']})")
+                continue
+
+            rows = list(self._paged(', '.join(BUNDLE_FIELDS), topic['id']))
+            manifest = build_bundle(topic, rows, self.output_dir, fingerprint, commit=False)
+
+            # The local manifest records what was published, so it is only
+            # replaced once the upload succeeded; a failed publish is retried
+            # by the next run instead of being skipped as unchanged
+            if self.bucket:
+                self._publish(manifest)
+            commit_manifest(manifest, self.output_dir)
+            print(f"✓ {topic['name']}: {manifest['question_count']} questions, "
+                  f"{manifest['compressed_size'] / 1024:.1f} KB (version {manifest['version']})")
+            rebuilt[topic['slug']] = manifest
+
+        self._write_index()
+        return rebuilt
+
+    def _write_index(self):
+        """Write index.json listing the current version of every built topic."""
+        if not os.path.isdir(self.output_dir):
+            return
+
+        index = {}
+        for slug in sorted(os.listdir(self.output_dir)):
+            manifest = self._load_manifest(slug)
+            if manifest:
+                index[slug] = {
+                    'topic_id': manifest['topic_id'],
+                    'version': manifest['version'],
+                    'question_count': manifest['question_count'],
+                    'manifest': f"{slug}/manifest.json"
+                }
+
+        with open(os.path.join(self.output_dir, 'index.json'), 'w') as f:
+            json.dump(index, f, indent=2)
+
+        if self.bucket:
+            self.client.storage.from_(self.bucket).upload('index.json', json.dumps(index).encode(), {
+                'content-type': 'application/json',
+                'cache-control': MANIFEST_MAX_AGE,
+                'x-upsert': 'true'
+            })
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Build per-topic question bundles')
+    parser.add_argument('--topic', type=str, action='append', help='Topic to rebuild (repeatable, default: all)')
+    parser.add_argument('--output-dir', type=str, default=DEFAULT_BUNDLE_DIR, help='Where bundles are written')
+    parser.add_argument('--bucket', type=str, help='Supabase Storage bucket to publish bundles to (default: QUESTION_BUNDLE_BUCKET)')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if a topic is unchanged')
+    args = parser.parse_args()
+
+    from uploader import SupabaseUploader
+    builder = QuestionBundleBuilder(SupabaseUploader(), args.output_dir, args.bucket)
+    rebuilt = builder.rebuild(args.topic, force=args.force)
+    print(f"\nRebuilt {len(rebuilt)} topic bundle(s) in {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+"""
+Compute budget defaults for per-question SymPy work.
+
+Kept free of heavy imports so the CLI entry points can build their argument
+parsers before deciding whether to hand work to a running daemon.
+"""
+
+DEFAULT_QUESTION_TIMEOUT = 5.0
+DEFAULT_MAX_OPS = 400
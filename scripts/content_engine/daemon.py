@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Content Engine Daemon - Keep generators and the uploader warm between runs.
+
+Usage:
+    python daemon.py
+    python daemon.py --port 8765 --workers 2
+
+Jobs are submitted over a local HTTP API and stored in a SQLite queue
+(jobs.db), so queued work survives restarts. main.py and bulk_generate.py
+submit to the daemon automatically when it is running.
+
+Endpoints:
+    POST /jobs        {"topic", "count", "difficulty", "mode": "template"|"llm", "upload"}
+    GET  /jobs        recent jobs
+    GET  /jobs/<id>   job status and progress
+    GET  /metrics     counters and timings
+    GET  /health      liveness
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from template_fast_generator import TemplateFastGenerator
+from generator import MathGenerator
+from uploader import SupabaseUploader
+from bundle_builder import QuestionBundleBuilder
+from compute_budget import DEFAULT_QUESTION_TIMEOUT
+
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs.db')
+JOB_MODES = ('template', 'llm')
+
+# Running jobs in these phases may already have written to Supabase, so a
+# restart fails them for manual review instead of requeueing them
+RECOVERY_ERRORS = {
+    'uploading': "Interrupted during upload; some questions may already be in Supabase. "
+                 "Check the topic before resubmitting.",
+    'bundling': "Interrupted after upload; questions are in Supabase but bundles are stale. "
+                "Run bundle_builder.py for this topic.",
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobQueue:
+    """Durable FIFO job queue backed by SQLite."""
+
+    COLUMNS = ['id', 'topic', 'count', 'difficulty', 'mode', 'upload', 'bundles', 'question_timeout',
+               'status', 'phase', 'attempted', 'generated', 'uploaded', 'error', 'sample',
+               'created_at', 'started_at', 'finished_at']
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                topic TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                difficulty INTEGER NOT NULL DEFAULT 1,
+                mode TEXT NOT NULL DEFAULT 'template',
+                upload INTEGER NOT NULL DEFAULT 1,
+                bundles INTEGER NOT NULL DEFAULT 1,
+                question_timeout REAL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                phase TEXT,
+                attempted INTEGER NOT NULL DEFAULT 0,
+                generated INTEGER NOT NULL DEFAULT 0,
+                uploaded INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                sample TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        ''')
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        if 'phase' not in columns:
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN phase TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)')
+        self._conn.commit()
+
+    def _row(self, row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        job['upload'] = bool(job['upload'])
+        job['bundles'] = bool(job['bundles'])
+        job['sample'] = json.loads(job['sample']) if job['sample'] else None
+        return job
+
+    def recover(self) -> Tuple[int, int]:
+        """
+        Settle jobs left running by a previous daemon process.
+
+        Jobs interrupted while generating are requeued from scratch. Jobs that
+        had started uploading are marked failed instead, because rerunning them
+        would insert their questions a second time.
+
+        Returns:
+            (requeued, failed) job counts
+        """
+        finished_at = _now()
+        with self._lock:
+            failed = 0
+            for phase, error in RECOVERY_ERRORS.items():
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                    "WHERE status = 'running' AND phase = ?",
+                    (error, finished_at, phase)
+                )
+                failed += cursor.rowcount
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', phase = NULL, attempted = 0, generated = 0 "
+                "WHERE status = 'running'"
+            )
+            self._conn.commit()
+            return cursor.rowcount, failed
+
+    def submit(self, topic: str, count: int, difficulty: int = 1, mode: str = 'template',
+               upload: bool = True, bundles: bool = True,
+               question_timeout: float = DEFAULT_QUESTION_TIMEOUT) -> Dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, topic, count, difficulty, mode, upload, bundles, question_timeout, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, topic, count, difficulty, mode, int(upload), int(bundles), question_timeout, _now())
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', phase = 'generating', started_at = ? WHERE id = ?",
+                (_now(), row[0])
+            )
+            self._conn.commit()
+        return self.get(row[0])
+
+    def update(self, job_id: str, **fields):
+        if 'sample' in fields:
+            fields['sample'] = json.dumps(fields['sample'])
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return dict(rows)
+
+
+class Metrics:
+    """Thread-safe counters exposed at /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters: Dict[str, float] = {
+            'jobs_completed': 0,
+            'jobs_failed': 0,
+            'questions_generated': 0,
+            'questions_uploaded': 0,
+            'generation_seconds': 0.0,
+            'upload_seconds': 0.0,
+        }
+
+    def add(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        uptime = time.time() - self.started_at
+        counters['uptime_seconds'] = round(uptime, 1)
+        counters['questions_per_second'] = (
+            round(counters['questions_generated'] / counters['generation_seconds'], 2)
+            if counters['generation_seconds'] else 0.0
+        )
+        return counters
+
+
+class ContentEngineDaemon:
+    """
+    Owns the warm generator pool, the persistent uploader connection and
+    the worker threads that drain the job queue.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = 2):
+        self.queue = queue
+        self.metrics = Metrics()
+        self.stop_event = threading.Event()
+        self.busy_workers = 0
+        self._busy_lock = threading.Lock()
+
+        # Each template worker owns a generator (and so its own watchdog process)
+        self.template_generators = [TemplateFastGenerator() for _ in range(workers)]
+
+        # LLM jobs share one generator so its provider rate limit holds across jobs
+        self.math_generator = MathGenerator()
+        self.math_lock = threading.Lock()
+
+        try:
+            self.uploader = SupabaseUploader()
+            self.bundle_builder = QuestionBundleBuilder(self.uploader)
+        except ValueError as e:
+            print(f"Uploads disabled: {e}")
+            self.uploader = None
+            self.bundle_builder = None
+        self.upload_lock = threading.Lock()
+
+        self.threads = [
+            threading.Thread(target=self._worker_loop, args=(generator,), daemon=True, name=f"worker-{i}")
+            for i, generator in enumerate(self.template_generators)
+        ]
+
+    def start(self):
+        requeued, failed = self.queue.recover()
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s)")
+        if failed:
+            print(f"⚠ Marked {failed} job(s) interrupted after uploading as failed; see GET /jobs")
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        for generator in self.template_generators:
+            generator.watchdog.close()
+        self.math_generator.watchdog.close()
+
+    def _worker_loop(self, template_generator: TemplateFastGenerator):
+        while not self.stop_event.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.stop_event.wait(0.5)
+                continue
+
+            with self._busy_lock:
+                self.busy_workers += 1
+            try:
+                self._run_job(job, template_generator)
+            except Exception as e:
+                print(f"✗ Job {job['id']} failed: {e}")
+                self.queue.update(job['id'], status='failed', error=str(e), finished_at=_now())
+                self.metrics.add(jobs_failed=1)
+            finally:
+                with self._busy_lock:
+                    self.busy_workers -= 1
+
+    def _run_job(self, job: Dict[str, Any], template_generator: TemplateFastGenerator):
+        print(f"▶ Job {job['id']}: {job['count']} {job['mode']} questions for '{job['topic']}'")
+
+        def progress(attempted: int, generated: int):
+            if attempted % 10 == 0 or attempted == job['count']:
+                self.queue.update(job['id'], attempted=attempted, generated=generated)
+
+        start_time = time.time()
+        if job['mode'] == 'llm':
+            with self.math_lock:
+                self.math_generator.watchdog.timeout = job['question_timeout'] or DEFAULT_QUESTION_TIMEOUT
+                questions = self.math_generator.generate_batch(job['topic'], job['count'], progress)
+        else:
+            template_generator.watchdog.timeout = job['question_timeout'] or DEFAULT_QUESTION_TIMEOUT
+            questions = template_generator.generate_batch(job['topic'], job['count'], progress)
+        generation_time = time.time() - start_time
+
+        self.queue.update(job['id'], attempted=job['count'], generated=len(questions),
+                          sample=questions[0] if questions else None)
+        self.metrics.add(questions_generated=len(questions), generation_seconds=generation_time)
+
+        uploaded = 0
+        if job['upload']:
+            if self.uploader is None:
+                raise ValueError("Uploads are disabled: missing Supabase credentials")
+
+            start_time = time.time()
+            with self.upload_lock:
+                self.queue.update(job['id'], phase='uploading')
+                uploaded = self.uploader.upload_questions(job['topic'], questions, job['difficulty'])
+                self.queue.update(job['id'], phase='bundling', uploaded=uploaded)
+                if job['bundles']:
+                    self.bundle_builder.rebuild([job['topic']])
+            self.metrics.add(questions_uploaded=uploaded, upload_seconds=time.time() - start_time)
+
+        self.queue.update(job['id'], status='completed', phase=None, uploaded=uploaded, finished_at=_now())
+        self.metrics.add(jobs_completed=1)
+        print(f"✓ Job {job['id']}: generated {len(questions)}, uploaded {uploaded}")
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """HTTP API for the daemon."""
+
+    protocol_version = 'HTTP/1.1'
+    engine: ContentEngineDaemon = None
+
+    def _send_json(self, status: int, body: Any):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif self.path == '/metrics':
+            metrics = self.engine.metrics.snapshot()
+            metrics['jobs'] = self.engine.queue.counts()
+            metrics['workers'] = len(self.engine.threads)
+            metrics['busy_workers'] = self.engine.busy_workers
+            self._send_json(200, metrics)
+        elif self.path == '/jobs':
+            self._send_json(200, self.engine.queue.recent())
+        elif self.path.startswith('/jobs/'):
+            job = self.engine.queue.get(self.path[len('/jobs/'):])
+            self._send_json(200 if job else 404, job or {'error': 'unknown job'})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            topic, count = str(body['topic']), int(body['count'])
+            difficulty = int(body.get('difficulty', 1))
+            mode = body.get('mode', 'template')
+            question_timeout = float(body.get('question_timeout', DEFAULT_QUESTION_TIMEOUT))
+        except (KeyError, TypeError, ValueError):
+            self._send_json(400, {'error': 'expected JSON body with topic and count'})
+            return
+
+        if count < 1 or not 1 <= difficulty <= 5 or mode not in JOB_MODES:
+            self._send_json(400, {'error': f"count must be positive, difficulty 1-5, mode one of {JOB_MODES}"})
+            return
+
+        job = self.engine.queue.submit(topic, count, difficulty, mode, bool(body.get('upload', True)),
+                                       bool(body.get('bundles', True)), question_timeout)
+        self._send_json(202, job)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Run the content engine as a long-lived daemon')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--workers', type=int, default=2, help='Warm template generator workers (default: 2)')
+    parser.add_argument('--queue', type=str, default=DEFAULT_QUEUE_PATH, help='SQLite job queue path')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CONTENT ENGINE DAEMON")
+    print("=" * 60)
+
+    daemon = ContentEngineDaemon(JobQueue(args.queue), workers=args.workers)
+    daemon.start()
+
+    handler = type('BoundDaemonHandler', (DaemonHandler,), {'engine': daemon})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+
+    print(f"Listening on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    print("=" * 60)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        daemon.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Thin client for the content engine daemon (daemon.py).
+
+main.py and bulk_generate.py use this to hand jobs to a running daemon
+instead of paying the cold-start cost themselves.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+
+DEFAULT_DAEMON_URL = "http://127.0.0.1:8765"
+
+
+def daemon_url() -> str:
+    return os.getenv('CONTENT_ENGINE_DAEMON_URL', DEFAULT_DAEMON_URL).rstrip('/')
+
+
+def _request(path: str, body: Optional[Dict[str, Any]] = None, timeout: float = 5.0) -> Any:
+    data = json.dumps(body).encode() if body is not None else None
+    request = Request(f"{daemon_url()}{path}", data=data, headers={'Content-Type': 'application/json'})
+    with urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def daemon_available() -> bool:
+    """True if a daemon answers /health at CONTENT_ENGINE_DAEMON_URL."""
+    try:
+        return _request('/health', timeout=0.5).get('status') == 'ok'
+    except (URLError, OSError, ValueError):
+        return False
+
+
+def submit_job(topic: str, count: int, difficulty: int = 1, mode: str = 'template',
+               upload: bool = True, bundles: bool = True, question_timeout: Optional[float] = None) -> Dict[str, Any]:
+    body = {'topic': topic, 'count': count, 'difficulty': difficulty, 'mode': mode,
+            'upload': upload, 'bundles': bundles}
+    if question_timeout is not None:
+        body['question_timeout'] = question_timeout
+    return _request('/jobs', body)
+
+
+def wait_for_job(job_id: str, poll_interval: float = 1.0) -> Dict[str, Any]:
+    """Poll a job until it finishes, printing progress. Returns the final job."""
+    last_attempted = 0
+    while True:
+        job = _request(f"/jobs/{job_id}")
+        if job['attempted'] > last_attempted and job['status'] == 'running':
+            print(f"  {job['attempted']}/{job['count']} attempted, {job['generated']} generated")
+            last_attempted = job['attempted']
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(poll_interval)
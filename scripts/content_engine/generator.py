@@ -1,12 +1,15 @@
 import random
-import time
-from typing import List, Dict, Any
+from concurrent.futures import Future, as_completed
+from typing import List, Dict, Any, Tuple, Callable, Optional
 import sympy as sp
 from sympy import symbols, sin, cos, tan, exp, log, diff, latex
 from langchain_mistralai import ChatMistralAI
 from langchain_nvidia_ai_endpoints import ChatNVIDIA
 from langchain.prompts import ChatPromptTemplate
+from langchain.schema import SystemMessage, HumanMessage
 import os
+from llm_pool import LangChainProvider, ProviderPool
+from sympy_watchdog import SymbolicWatchdog, BudgetExceeded, within_op_budget, DEFAULT_QUESTION_TIMEOUT, DEFAULT_MAX_OPS
 
 
 class MathGenerator:
@@ -15,29 +18,41 @@ class MathGenerator:
     LLM is only used for generating human-readable solution steps.
     """
     
-    def __init__(self):
+    def __init__(self, question_timeout: float = DEFAULT_QUESTION_TIMEOUT, max_ops: int = DEFAULT_MAX_OPS):
         self.x = symbols('x')
-        self.llm = None
-        self.last_llm_request_time = 0
+        self.max_ops = max_ops
+        self.watchdog = SymbolicWatchdog(timeout=question_timeout)
         
-        # Try Mistral first, then NVIDIA as fallback
+        # Every configured provider joins the pool, each with its own rate limit
+        providers = []
         if os.getenv('MISTRAL_API_KEY'):
             try:
-                self.llm = ChatMistralAI(model="mistral-large-latest", temperature=0.7)
-                print("Using Mistral AI for solution steps")
+                # Mistral free tier = 1 req/sec
+                llm = ChatMistralAI(model="mistral-large-latest", temperature=0.7)
+                providers.append(LangChainProvider('mistral', llm, requests_per_second=1 / 1.1))
             except Exception as e:
                 print(f"Mistral AI failed: {e}")
         
-        if not self.llm and os.getenv('NVIDIA_API_KEY'):
+        if os.getenv('NVIDIA_API_KEY'):
             try:
-                self.llm = ChatNVIDIA(model="mistralai/mistral-large", temperature=0.7)
-                print("Using NVIDIA AI for solution steps")
+                llm = ChatNVIDIA(model="mistralai/mistral-large", temperature=0.7)
+                providers.append(LangChainProvider('nvidia', llm, requests_per_second=0.6))
             except Exception as e:
                 print(f"NVIDIA AI failed: {e}")
         
-        if not self.llm:
+        self.llm_pool = ProviderPool(providers) if providers else None
+        if self.llm_pool:
+            print(f"Using {', '.join(p.name for p in providers)} for solution steps")
+        else:
             print("No LLM available - using template solution steps")
     
+    def __getstate__(self):
+        # Only the symbolic state is shipped to the watchdog worker
+        state = self.__dict__.copy()
+        state.pop('watchdog', None)
+        state['llm_pool'] = None
+        return state
+    
     def _generate_random_function(self, topic: str) -> sp.Expr:
         """Generate a random function based on the topic."""
         
@@ -101,6 +116,8 @@ class MathGenerator:
         candidates = [distractor_1, distractor_2, distractor_3, distractor_4]
         
         for candidate in candidates[:count]:
+            if not within_op_budget(candidate, self.max_ops):
+                continue
             simplified = sp.simplify(candidate)
             if simplified != correct_answer:
                 distractors.append(simplified)
@@ -113,38 +130,39 @@ class MathGenerator:
         
         return distractors[:count]
     
-    def _generate_solution_steps(self, function: sp.Expr, derivative: sp.Expr, topic: str) -> List[str]:
-        """Generate human-readable solution steps using LLM if available, otherwise use template."""
+    def _cheap_distractors(self, correct_answer: sp.Expr, count: int = 3) -> List[sp.Expr]:
+        """Fallback distractors that need no simplification."""
+        distractors = []
         
-        if self.llm:
-            try:
-                # Rate limit: wait 1.1 seconds between requests (Mistral free tier = 1 req/sec)
-                current_time = time.time()
-                time_since_last = current_time - self.last_llm_request_time
-                if time_since_last < 1.1:
-                    time.sleep(1.1 - time_since_last)
-                
-                prompt = ChatPromptTemplate.from_messages([
-                    ("system", "You are a calculus tutor. Generate 3-4 clear, concise solution steps. IMPORTANT: Every single mathematical expression, variable (like x), or formula MUST be wrapped in double dollar signs, e.g., $$f(x)$$, $$x^2$$, or $$\\sin(x)$$. Return ONLY a JSON array of strings."),
-                    ("user", 
-                     f"Topic: {topic}\n"
-                     f"Function: f(x) = {sp.latex(function)}\n"
-                     f"Derivative: f'(x) = {sp.latex(derivative)}\n\n"
-                     f"Generate solution steps as JSON array like: [\"Step 1: Identify $$u = ...$$\", \"Step 2...\"]"
-                    )
-                ])
-                
-                chain = prompt | self.llm
-                response = chain.invoke({})
-                self.last_llm_request_time = time.time()
-                
-                import json
-                steps = json.loads(response.content)
-                return steps if isinstance(steps, list) else [response.content]
-            
-            except Exception as e:
-                print(f"LLM generation failed: {e}. Using template.")
+        for candidate in [correct_answer + 1, -correct_answer, 2*correct_answer, correct_answer + self.x]:
+            if candidate != correct_answer and candidate not in distractors:
+                distractors.append(candidate)
         
+        return distractors[:count]
+    
+    def _solve(self, function: sp.Expr) -> Tuple[sp.Expr, List[sp.Expr]]:
+        """Full symbolic work for a question (runs inside the watchdog)."""
+        derivative = self._compute_derivative(function)
+        return derivative, self._generate_distractors(derivative, count=3)
+    
+    def _solve_cheap(self, function: sp.Expr) -> Tuple[sp.Expr, List[sp.Expr]]:
+        """Derivative with cheap distractors, used after a timeout."""
+        derivative = self._compute_derivative(function)
+        return derivative, self._cheap_distractors(derivative, count=3)
+    
+    def _solution_prompt(self, function: sp.Expr, derivative: sp.Expr, topic: str) -> ChatPromptTemplate:
+        # Literal messages: LaTeX braces must not be parsed as template variables
+        return ChatPromptTemplate.from_messages([
+            SystemMessage(content="You are a calculus tutor. Generate 3-4 clear, concise solution steps. IMPORTANT: Every single mathematical expression, variable (like x), or formula MUST be wrapped in double dollar signs, e.g., $$f(x)$$, $$x^2$$, or $$\\sin(x)$$. Return ONLY a JSON array of strings."),
+            HumanMessage(content=
+             f"Topic: {topic}\n"
+             f"Function: f(x) = {sp.latex(function)}\n"
+             f"Derivative: f'(x) = {sp.latex(derivative)}\n\n"
+             f"Generate solution steps as JSON array like: [\"Step 1: Identify $$u = ...$$\", \"Step 2...\"]"
+            )
+        ])
+    
+    def _template_steps(self, function: sp.Expr, derivative: sp.Expr, topic: str) -> List[str]:
         if "chain" in topic.lower():
             return [
                 f"Identify the outer function and inner function in $${sp.latex(function)}$$",
@@ -158,13 +176,27 @@ class MathGenerator:
                 f"Simplify to get $$f'(x) = {sp.latex(derivative)}$$"
             ]
     
-    def generate_question(self, topic: str) -> Dict[str, Any]:
-        """Generate a single verified math question."""
+    def _generate_solution_steps(self, function: sp.Expr, derivative: sp.Expr, topic: str) -> List[str]:
+        """Generate human-readable solution steps using LLM if available, otherwise use template."""
+        
+        if self.llm_pool:
+            try:
+                return self.llm_pool.generate(self._solution_prompt(function, derivative, topic))
+            except Exception as e:
+                print(f"LLM generation failed: {e}. Using template.")
+        
+        return self._template_steps(function, derivative, topic)
+    
+    def _draft_question(self, topic: str) -> Tuple[sp.Expr, sp.Expr, List[Dict[str, Any]]]:
+        """Symbolic part of a question: function, verified derivative and shuffled options."""
         
         function = self._generate_random_function(topic)
-        correct_derivative = self._compute_derivative(function)
-        distractors = self._generate_distractors(correct_derivative, count=3)
-        solution_steps = self._generate_solution_steps(function, correct_derivative, topic)
+        
+        try:
+            correct_derivative, distractors = self.watchdog.run(self._solve, function)
+        except BudgetExceeded:
+            # Falls through to the caller if the cheap strategy also times out
+            correct_derivative, distractors = self.watchdog.run(self._solve_cheap, function)
         
         options = [
             {
@@ -183,27 +215,78 @@ class MathGenerator:
         
         random.shuffle(options)
         
-        correct_option = next(opt for opt in options if opt["is_correct"])
-        correct_option["is_correct"] = True
-        
-        content = {
+        return function, correct_derivative, options
+    
+    def _build_content(self, function: sp.Expr, derivative: sp.Expr, options: List[Dict[str, Any]],
+                       solution_steps: List[str]) -> Dict[str, Any]:
+        return {
             "statement": f"Find the derivative of $$f(x) = {sp.latex(function)}$$",
             "options": options,
-            "solution_steps": solution_steps
+            "solution_steps": solution_steps,
+            "answer_expr": str(derivative)
         }
+    
+    def generate_question(self, topic: str) -> Dict[str, Any]:
+        """Generate a single verified math question."""
         
-        return content
+        function, correct_derivative, options = self._draft_question(topic)
+        solution_steps = self._generate_solution_steps(function, correct_derivative, topic)
+        return self._build_content(function, correct_derivative, options, solution_steps)
     
-    def generate_batch(self, topic: str, count: int) -> List[Dict[str, Any]]:
-        """Generate multiple questions for a topic."""
-        questions = []
+    def generate_batch(self, topic: str, count: int,
+                       progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Generate multiple questions for a topic.
+        The symbolic work runs in order; each draft's solution steps are requested
+        from the LLM pool as soon as it is ready, so they arrive while later
+        questions are still being drafted.
+        progress_callback, if given, is called with (attempted, generated) as each
+        question is finished.
+        """
+        drafts = []
+        llm_steps: Dict[int, Optional[List[str]]] = {}
+        pending: Dict[Future, int] = {}
+        attempted = generated = 0
+        
+        def finish(ok: bool):
+            nonlocal attempted, generated
+            attempted += 1
+            generated += ok
+            if progress_callback:
+                progress_callback(attempted, generated)
+        
+        def collect(futures):
+            for future in futures:
+                llm_steps[pending.pop(future)] = future.result()
+                finish(True)
         
         for i in range(count):
             try:
-                question = self.generate_question(topic)
-                questions.append(question)
-                print(f"Generated question {i+1}/{count} for topic '{topic}'")
+                draft = self._draft_question(topic)
+            except BudgetExceeded as e:
+                draft = None
+                print(f"Skipped question {i+1}: {e}")
             except Exception as e:
+                draft = None
                 print(f"Failed to generate question {i+1}: {e}")
+            drafts.append(draft)
+            
+            if draft and self.llm_pool:
+                pending[self.llm_pool.submit(self._solution_prompt(draft[0], draft[1], topic))] = i
+                collect([future for future in pending if future.done()])
+            else:
+                finish(draft is not None)
+        
+        collect(as_completed(list(pending)))
+        
+        questions = []
+        
+        for i, draft in enumerate(drafts):
+            if draft:
+                function, derivative, options = draft
+                questions.append(self._build_content(
+                    function, derivative, options, llm_steps.get(i) or self._template_steps(function, derivative, topic)
+                ))
+                print(f"Generated question {i+1}/{count} for topic '{topic}'")
         
         return questions
@@ -0,0 +1,374 @@
+"""
+LLM Provider Pool - Spread solution-step requests across every configured LLM.
+
+Each provider has its own rate limiter and circuit breaker. Requests are
+routed to the provider with the best observed latency/error rate, hedged to
+a second provider if the first is slow once its request is actually sent,
+and only accepted once the response parses as a JSON array of step strings.
+
+Run this module directly for an offline simulation with fake providers:
+    python llm_pool.py
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+MAX_STEPS = 10
+
+
+class StepValidationError(ValueError):
+    """Raised when an LLM response is not a JSON array of step strings."""
+
+
+class AllProvidersFailed(Exception):
+    """Raised when no provider produced a valid response."""
+
+
+def parse_solution_steps(text: str) -> List[str]:
+    """Validate an LLM response as a JSON array of non-empty step strings."""
+    text = text.strip()
+    fenced = re.match(r'^```(?:json)?\s*(.*?)\s*```$', text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+
+    try:
+        steps = json.loads(text)
+    except ValueError as e:
+        raise StepValidationError(f"Response is not JSON: {e}")
+
+    if not isinstance(steps, list) or not 1 <= len(steps) <= MAX_STEPS:
+        raise StepValidationError(f"Expected a JSON array of 1-{MAX_STEPS} steps")
+    if not all(isinstance(step, str) and step.strip() for step in steps):
+        raise StepValidationError("Every step must be a non-empty string")
+
+    return steps
+
+
+class RateLimiter:
+    """Spaces requests at least 1/rate seconds apart (thread-safe)."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        with self._lock:
+            return max(0.0, self.next_slot - time.monotonic())
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now."""
+        with self._lock:
+            now = time.monotonic()
+            if self.next_slot > now:
+                return False
+            self.next_slot = now + self.interval
+            return True
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures; after reset_timeout
+    it lets a single trial request through (half-open) before closing again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+class LangChainProvider:
+    """Wraps a LangChain chat model (ChatMistralAI, ChatNVIDIA, ...)."""
+
+    def __init__(self, name: str, llm, requests_per_second: float = 1.0):
+        self.name = name
+        self.llm = llm
+        self.requests_per_second = requests_per_second
+
+    def complete(self, prompt) -> str:
+        return (prompt | self.llm).invoke({}).content
+
+
+class FakeProvider:
+    """
+    Offline stand-in for an LLM with injectable latency and failure rates.
+    invalid_rate controls how often it answers with text that is not a step array.
+    """
+
+    def __init__(self, name: str, latency: float = 0.1, jitter: float = 0.0, failure_rate: float = 0.0,
+                 invalid_rate: float = 0.0, requests_per_second: float = 0.0, seed: Optional[int] = None):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.invalid_rate = invalid_rate
+        self.requests_per_second = requests_per_second
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def complete(self, prompt) -> str:
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+        time.sleep(delay)
+
+        if roll < self.failure_rate:
+            raise ConnectionError(f"{self.name}: simulated failure")
+        if roll < self.failure_rate + self.invalid_rate:
+            return "Sure! Here are the steps: first differentiate..."
+        return json.dumps([f"Step 1: ({self.name}) {prompt}", "Step 2: Apply the rule", "Step 3: Simplify"])
+
+
+class _PoolMember:
+    """A provider plus the pool's bookkeeping for it."""
+
+    def __init__(self, provider, failure_threshold: int, reset_timeout: float, initial_latency: float):
+        self.provider = provider
+        self.name = provider.name
+        self.limiter = RateLimiter(getattr(provider, 'requests_per_second', 0.0))
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = initial_latency
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def score(self) -> float:
+        """Expected seconds until a good answer; lower is better."""
+        expected = self.latency + self.limiter.wait_time()
+        return expected / max(0.05, 1.0 - self.error_rate)
+
+    def record(self, elapsed: Optional[float], ok: bool, alpha: float = 0.2):
+        with self._lock:
+            self.requests += 1
+            if ok:
+                self.latency = (1 - alpha) * self.latency + alpha * elapsed
+            else:
+                self.errors += 1
+            self.error_rate = (1 - alpha) * self.error_rate + alpha * (0.0 if ok else 1.0)
+
+
+class ProviderPool:
+    """
+    Routes solution-step requests across providers.
+
+    hedge_after: seconds to wait on the first provider, counted from when its
+    rate limiter let the request through, before also asking the next best
+    one. Defaults to twice the first provider's observed latency. A backup
+    is only started if it has a free rate-limit slot at that moment.
+
+    concurrency: prompts from submit()/map() that are in progress at once.
+    """
+
+    def __init__(self, providers: Sequence[Any], hedge_after: Optional[float] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 initial_latency: float = 2.0, max_workers: int = 32, concurrency: int = 8,
+                 validator: Callable[[str], List[str]] = parse_solution_steps):
+        if not providers:
+            raise ValueError("ProviderPool needs at least one provider")
+        self.members = [_PoolMember(p, failure_threshold, reset_timeout, initial_latency) for p in providers]
+        self.hedge_after = hedge_after
+        self.validator = validator
+        self.hedges = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-pool')
+        self._fanout = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='llm-prompt')
+
+    def _ranked(self) -> List[_PoolMember]:
+        return sorted(self.members, key=lambda member: member.score())
+
+    def _attempt(self, member: _PoolMember, prompt) -> List[str]:
+        # The caller has already taken a rate-limit slot for this request
+        with member._lock:
+            member.in_flight += 1
+        start = time.monotonic()
+        try:
+            steps = self.validator(member.provider.complete(prompt))
+        except Exception:
+            member.record(None, ok=False)
+            member.breaker.record_failure()
+            raise
+        finally:
+            with member._lock:
+                member.in_flight -= 1
+
+        member.record(time.monotonic() - start, ok=True)
+        member.breaker.record_success()
+        return steps
+
+    def _next_allowed(self, candidates: List[_PoolMember]) -> Optional[_PoolMember]:
+        """Pop the next provider whose circuit allows a request and wait for its slot."""
+        while candidates:
+            member = candidates.pop(0)
+            if member.breaker.allow():
+                member.limiter.acquire()
+                return member
+        return None
+
+    def _free_backup(self, candidates: List[_PoolMember]) -> Optional[_PoolMember]:
+        """
+        Take the best provider that can send right away. A backup that first
+        has to queue for its rate limit would rarely beat the slow request.
+        """
+        for member in candidates:
+            if member.breaker.state != 'open' and member.limiter.try_acquire() and member.breaker.allow():
+                candidates.remove(member)
+                return member
+        return None
+
+    def generate(self, prompt) -> List[str]:
+        """
+        Get validated solution steps for one prompt.
+        Raises AllProvidersFailed if every available provider fails.
+        """
+        candidates = self._ranked()
+        pending: Dict[Future, _PoolMember] = {}
+        errors: List[str] = []
+
+        # Waiting for the rate limiter happens here, before the hedge clock starts
+        first = self._next_allowed(candidates)
+        if first is None:
+            raise AllProvidersFailed("All provider circuits are open")
+        pending[self._executor.submit(self._attempt, first, prompt)] = first
+        hedge_delay = self.hedge_after if self.hedge_after is not None else 2 * first.latency
+        hedged = False
+
+        while pending:
+            done, _ = wait(pending, timeout=None if hedged else hedge_delay, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # First provider is slow: race it against a backup that is free to send now
+                hedged = True
+                backup = self._free_backup(candidates)
+                if backup is not None:
+                    self.hedges += 1
+                    pending[self._executor.submit(self._attempt, backup, prompt)] = backup
+                continue
+
+            for future in done:
+                member = pending.pop(future)
+                try:
+                    steps = future.result()
+                except Exception as e:
+                    errors.append(f"{member.name}: {e}")
+                    continue
+                # The losing request may still be queued behind busy executor threads
+                for loser in pending:
+                    loser.cancel()
+                return steps
+
+            if not pending:
+                replacement = self._next_allowed(candidates)
+                if replacement is not None:
+                    pending[self._executor.submit(self._attempt, replacement, prompt)] = replacement
+
+        raise AllProvidersFailed("; ".join(errors) or "No provider available")
+
+    def _generate_or_none(self, prompt) -> Optional[List[str]]:
+        if prompt is None:
+            return None
+        try:
+            return self.generate(prompt)
+        except AllProvidersFailed as e:
+            print(f"LLM generation failed: {e}. Using template.")
+            return None
+
+    def submit(self, prompt) -> Future:
+        """
+        Start generating steps for one prompt in the background. The future
+        resolves to the steps, or None if every provider failed.
+        """
+        return self._fanout.submit(self._generate_or_none, prompt)
+
+    def map(self, prompts: Sequence[Any]) -> List[Optional[List[str]]]:
+        """
+        Fan prompts out concurrently; returns steps per prompt, or None where
+        every provider failed (or the prompt itself was None).
+        """
+        return [future.result() for future in [self.submit(prompt) for prompt in prompts]]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            member.name: {
+                'requests': member.requests,
+                'errors': member.errors,
+                'latency_ewma': round(member.latency, 3),
+                'error_rate_ewma': round(member.error_rate, 3),
+                'circuit': member.breaker.state,
+            }
+            for member in self.members
+        }
+
+    def close(self):
+        self._fanout.shutdown(wait=False, cancel_futures=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    # Offline simulation: a fast but flaky provider, a slow reliable one,
+    # and one that is down entirely
+    providers = [
+        FakeProvider('fast-flaky', latency=0.05, jitter=0.02, failure_rate=0.2, invalid_rate=0.1, seed=1),
+        FakeProvider('slow-steady', latency=0.3, jitter=0.1, seed=2),
+        FakeProvider('down', latency=0.01, failure_rate=1.0, seed=3),
+    ]
+    pool = ProviderPool(providers, initial_latency=0.1, failure_threshold=3, reset_timeout=2.0)
+
+    start = time.time()
+    results = pool.map([f"question {i}" for i in range(100)])
+    elapsed = time.time() - start
+
+    print(f"Answered {sum(r is not None for r in results)}/100 prompts in {elapsed:.2f}s ({pool.hedges} hedged)")
+    print(json.dumps(pool.stats(), indent=2))
+    pool.close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Load Test - Measure answer checker latency under concurrent clients.
+
+Usage:
+    python load_test_answer_checker.py
+    python load_test_answer_checker.py --clients 32 --requests 500
+    python load_test_answer_checker.py --url http://127.0.0.1:8787 --questions-file questions.json
+
+Without --url, an in-process server is started over freshly generated
+template questions, so no database is needed.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+from answer_checker import AnswerChecker, FileQuestionSource, create_server
+
+
+WRONG_ANSWERS = ['x', '2*x + 1', 'sin(x)', 'exp(x)/x', '-cos(x**2)']
+
+
+def build_fixture(count: int) -> List[Dict[str, Any]]:
+    """Generate template questions and assign them ids."""
+    from template_fast_generator import TemplateFastGenerator
+
+    generator = TemplateFastGenerator()
+    topics = ["Chain Rule", "Product Rule", "Quotient Rule", "Basic Derivatives"]
+    rows = []
+    for i in range(count):
+        content = generator.generate_question(topics[i % len(topics)], variation=i)
+        rows.append({'id': str(uuid.uuid4()), 'content': content})
+    generator.watchdog.close()
+    return rows
+
+
+def run_client(host: str, port: int, rows: List[Dict[str, Any]], requests: int,
+               latencies: List[float], errors: List[str], lock: threading.Lock):
+    """One client thread on a persistent keep-alive connection."""
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    local_latencies = []
+    for _ in range(requests):
+        row = random.choice(rows)
+        answer = row['content']['answer_expr'] if random.random() < 0.5 else random.choice(WRONG_ANSWERS)
+        body = json.dumps({'question_id': row['id'], 'answer': answer})
+
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/check', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(f"HTTP {response.status}")
+        except Exception as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        local_latencies.append(time.perf_counter() - start)
+
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the answer checking service')
+    parser.add_argument('--url', type=str, help='Existing server to target (default: start one in-process)')
+    parser.add_argument('--questions-file', type=str, help='Question rows the target server knows about')
+    parser.add_argument('--questions', type=int, default=200, help='Generated questions for the in-process server (default: 200)')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients (default: 16)')
+    parser.add_argument('--requests', type=int, default=250, help='Requests per client (default: 250)')
+    args = parser.parse_args()
+
+    if args.questions_file:
+        with open(args.questions_file) as f:
+            rows = json.load(f)
+    else:
+        print(f"Generating {args.questions} fixture questions...")
+        rows = build_fixture(args.questions)
+
+    server = None
+    if args.url:
+        target = urlparse(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        server = create_server(AnswerChecker(FileQuestionSource(rows=rows)), port=0)
+        host, port = server.server_address[:2]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"Target: http://{host}:{port}  clients={args.clients}  requests/client={args.requests}")
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=run_client, args=(host, port, rows, args.requests, latencies, errors, lock))
+        for _ in range(args.clients)
+    ]
+
+    start_time = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total_time = time.time() - start_time
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+    latencies.sort()
+    print("\n" + "=" * 60)
+    print("ANSWER CHECKER LOAD TEST")
+    print("=" * 60)
+    print(f"Requests: {len(latencies)} ok, {len(errors)} failed")
+    print(f"Throughput: {len(latencies) / total_time:.0f} requests/second")
+    if latencies:
+        for pct in (50, 95, 99):
+            print(f"p{pct}: {percentile(latencies, pct) * 1000:.2f} ms")
+        print(f"max: {latencies[-1] * 1000:.2f} ms")
+    if errors:
+        print(f"First error: {errors[0]}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,10 +8,41 @@ Usage:
 """
 
 import argparse
+import json
 import os
 from dotenv import load_dotenv
-from generator import MathGenerator
-from uploader import SupabaseUploader
+from compute_budget import DEFAULT_QUESTION_TIMEOUT
+import daemon_client
+
+
+def run_via_daemon(args) -> bool:
+    """Hand the run to a running daemon. Returns False if none is available."""
+    if args.no_daemon or not daemon_client.daemon_available():
+        return False
+    
+    print(f"Submitting to content engine daemon at {daemon_client.daemon_url()}...")
+    job = daemon_client.submit_job(
+        args.topic, args.count, args.difficulty, mode='llm',
+        upload=not args.skip_upload, bundles=not args.skip_bundles,
+        question_timeout=args.question_timeout
+    )
+    print(f"Job {job['id']} queued")
+    job = daemon_client.wait_for_job(job['id'])
+    
+    print()
+    print("=" * 60)
+    if job['status'] == 'completed':
+        print(f"✓ Generated {job['generated']}/{job['count']} questions")
+        if not args.skip_upload:
+            print(f"  - Uploaded: {job['uploaded']}/{job['generated']} questions")
+    else:
+        print(f"✗ Job failed: {job['error']}")
+    print("=" * 60)
+    
+    if args.skip_upload and job['sample']:
+        print("\nSample question:")
+        print(json.dumps(job['sample'], indent=2))
+    return True
 
 
 def main():
@@ -32,7 +63,7 @@ def main():
         '--count',
         type=int,
         required=True,
-        help='Number of questions to generate (Note: Mistral free tier has 1 req/sec limit)'
+        help='Number of questions to generate (Note: each LLM provider is rate limited)'
     )
     
     parser.add_argument(
@@ -49,16 +80,43 @@ def main():
         help='Generate questions but skip uploading to Supabase'
     )
     
+    parser.add_argument(
+        '--skip-bundles',
+        action='store_true',
+        help='Do not rebuild the topic\'s question bundle after uploading'
+    )
+    
+    parser.add_argument(
+        '--question-timeout',
+        type=float,
+        default=DEFAULT_QUESTION_TIMEOUT,
+        help=f'Wall-clock budget in seconds for each question\'s SymPy work (default: {DEFAULT_QUESTION_TIMEOUT})'
+    )
+    
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Run in this process even if the content engine daemon is running'
+    )
+    
     args = parser.parse_args()
     
+    if run_via_daemon(args):
+        return
+    
+    # Heavy imports (SymPy, LangChain, Supabase) are only paid when running locally
+    from generator import MathGenerator
+    from uploader import SupabaseUploader
+    from bundle_builder import QuestionBundleBuilder
+    
     print("=" * 60)
     print("SPACED REPETITION - CONTENT ENGINE (Mistral Free Tier)")
     print("=" * 60)
     print(f"Topic: {args.topic}")
     print(f"Count: {args.count}")
     print(f"Difficulty: {args.difficulty}")
-    if os.getenv('MISTRAL_API_KEY'):
-        print(f"Note: Will respect 1 req/sec rate limit (≈{args.count * 1.1:.1f}s total)")
+    if os.getenv('MISTRAL_API_KEY') or os.getenv('NVIDIA_API_KEY'):
+        print("Note: Solution steps are spread across all configured LLM providers, each rate limited")
     else:
         print("Note: Using template solution steps (no API key)")
     print("=" * 60)
@@ -67,18 +125,20 @@ def main():
     print("Step 1: Generating questions with SymPy verification...")
     print("-" * 60)
     
-    generator = MathGenerator()
+    generator = MathGenerator(question_timeout=args.question_timeout)
     questions = generator.generate_batch(args.topic, args.count)
+    generator.watchdog.close()
     
     print()
     print(f"✓ Successfully generated {len(questions)}/{args.count} questions")
+    if generator.watchdog.quarantine:
+        print(f"⚠ Quarantined {len(generator.watchdog.quarantine)} expressions (see quarantine.jsonl)")
     print()
     
     if args.skip_upload:
         print("Skipping upload (--skip-upload flag set)")
         print("\nSample question:")
         if questions:
-            import json
             print(json.dumps(questions[0], indent=2))
         return
     
@@ -112,6 +172,17 @@ def main():
         print("1. Created a .env file with SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
         print("2. Run the database migration in Supabase")
         print("3. Have network connectivity to Supabase")
+        return
+    
+    if not args.skip_bundles:
+        print()
+        print("Step 3: Rebuilding question bundle...")
+        print("-" * 60)
+        try:
+            QuestionBundleBuilder(uploader).rebuild([args.topic])
+        except Exception as e:
+            print(f"✗ Bundle rebuild failed: {e}")
+            print("  The questions were uploaded; rerun `python bundle_builder.py` to publish the bundle")
 
 
 if __name__ == '__main__':
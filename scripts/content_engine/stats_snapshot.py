@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Stats Snapshot Job - Materialize per-topic and per-user statistics.
+
+Usage:
+    python stats_snapshot.py            # incremental, since the last watermark
+    python stats_snapshot.py --full     # drop snapshots and rebuild from scratch
+
+Reviews are streamed in (ingested_at, id) keyset order, folded into
+bounded in-memory deltas, and merged into user_stats_snapshot and
+topic_stats_snapshot (see supabase/migrations/20260110_stats_snapshots.sql).
+ingested_at is stamped by the database when a review is inserted, and only
+reviews older than a safety lag are folded, so a review whose transaction
+commits late still lands above the watermark.
+Each flush adds its deltas and advances the watermark in one transaction
+(apply_stats_deltas), so an interrupted run resumes where it left off and an
+overlapping run fails instead of counting reviews twice. Mastery distribution
+is recomputed from user_topic_state on every run.
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+
+JOB_NAME = 'stats_snapshot'
+MASTERY_BUCKETS = 5
+# mastery_score is the web client's 0-2000 skill rating (RATING_MAX in masteryAlgorithm.ts)
+MASTERY_RATING_MAX = 2000.0
+LOOKUP_CHUNK = 200
+DEFAULT_SAFETY_LAG = 300.0
+
+
+def mastery_bucket(score: Optional[float]) -> int:
+    """Index into the mastery distribution for a skill rating in [0, 2000]."""
+    fraction = min(max((score or 0.0) / MASTERY_RATING_MAX, 0.0), 1.0)
+    return min(int(fraction * MASTERY_BUCKETS), MASTERY_BUCKETS - 1)
+
+
+def _later(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    """The later of two ISO timestamps (either may be None)."""
+    if a is None or b is None:
+        return a or b
+    return a if datetime.fromisoformat(a) >= datetime.fromisoformat(b) else b
+
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _after(query, columns: Tuple[str, str], key: Tuple[str, str]):
+    """
+    Restrict a query to rows after key in (columns[0], columns[1]) order.
+    postgrest 0.13 has no or_(), so the logic tree is added as a raw param.
+    """
+    first, second = columns
+    query.params = query.params.add(
+        'or', f'({first}.gt."{key[0]}",and({first}.eq."{key[0]}",{second}.gt."{key[1]}"))'
+    )
+    return query
+
+
+class StatsSnapshotJob:
+    """
+    Incrementally folds new reviews into snapshot rows.
+    Memory is bounded by flush_threshold (user/topic pairs held between
+    flushes) and question_cache_size (question -> topic lookups).
+    safety_lag is how many seconds a review must have been ingested before it
+    is folded; it should exceed the longest transaction that inserts reviews.
+    """
+
+    def __init__(self, client, page_size: int = 1000, flush_threshold: int = 20000,
+                 time_column: str = 'time_taken_seconds', question_cache_size: int = 200000,
+                 safety_lag: float = DEFAULT_SAFETY_LAG):
+        self.client = client
+        self.page_size = page_size
+        self.flush_threshold = flush_threshold
+        self.time_column = time_column
+        self.question_cache_size = question_cache_size
+        self.safety_lag = safety_lag
+        self.question_topics: Dict[str, str] = {}
+
+    # Watermark
+
+    def _load_watermark(self) -> Optional[Tuple[str, str]]:
+        response = self.client.table('stats_watermarks').select('*').eq('job', JOB_NAME).execute()
+        if response.data and response.data[0].get('last_ingested_at'):
+            row = response.data[0]
+            return row['last_ingested_at'], row['last_review_id']
+        return None
+
+    def _reset(self):
+        """Drop all snapshot rows and the watermark (full rebuild)."""
+        self.client.rpc('reset_stats_snapshots', {'p_job': JOB_NAME}).execute()
+
+    # Streaming reads
+
+    def _review_pages(self, watermark: Optional[Tuple[str, str]], cutoff: str) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of reviews after the watermark and before cutoff in (ingested_at, id) order."""
+        columns = f"id, user_id, question_id, is_correct, reviewed_at, ingested_at, {self.time_column}"
+        while True:
+            query = self.client.table('reviews').select(columns).lt('ingested_at', cutoff)
+            if watermark:
+                query = _after(query, ('ingested_at', 'id'), watermark)
+            # One order param: PostgREST reads a single comma-separated list
+            page = query.order('ingested_at,id').limit(self.page_size).execute().data
+
+            if not page:
+                return
+            yield page
+            if len(page) < self.page_size:
+                return
+            watermark = (page[-1]['ingested_at'], page[-1]['id'])
+
+    def _resolve_topics(self, question_ids: List[str]):
+        """Fill question_topics for any ids not yet cached."""
+        if len(self.question_topics) > self.question_cache_size:
+            self.question_topics.clear()
+
+        missing = list({qid for qid in question_ids if qid and qid not in self.question_topics})
+        for chunk in _chunks(missing, LOOKUP_CHUNK):
+            response = self.client.table('questions').select('id, topic_id').in_('id', chunk).execute()
+            for row in response.data:
+                self.question_topics[row['id']] = row['topic_id']
+
+    # Merging
+
+    def _flush(self, user_deltas: Dict[Tuple[str, str], List[Any]], topic_deltas: Dict[str, List[Any]],
+               expected: Optional[Tuple[str, str]], watermark: Tuple[str, str]):
+        """
+        Merge accumulated deltas into the snapshot tables and move the watermark
+        from expected to watermark, atomically. Fails if another run moved it.
+        """
+        self.client.rpc('apply_stats_deltas', {
+            'p_job': JOB_NAME,
+            'p_expected_ingested_at': expected[0] if expected else None,
+            'p_expected_review_id': expected[1] if expected else None,
+            'p_ingested_at': watermark[0],
+            'p_review_id': watermark[1],
+            'p_user_deltas': [
+                {'user_id': user_id, 'topic_id': topic_id, 'attempts': delta[0], 'correct': delta[1],
+                 'total_time_seconds': delta[2], 'last_reviewed_at': delta[3]}
+                for (user_id, topic_id), delta in user_deltas.items()
+            ],
+            'p_topic_deltas': [
+                {'topic_id': topic_id, 'attempts': delta[0], 'correct': delta[1], 'total_time_seconds': delta[2]}
+                for topic_id, delta in topic_deltas.items()
+            ]
+        }).execute()
+
+    def _fold_reviews(self, watermark: Optional[Tuple[str, str]]) -> int:
+        """Stream reviews after the watermark into the snapshots. Returns the review count."""
+        user_deltas: Dict[Tuple[str, str], List[Any]] = {}
+        topic_deltas: Dict[str, List[Any]] = {}
+        processed = 0
+        flushed = watermark
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=self.safety_lag)).isoformat()
+
+        for page in self._review_pages(watermark, cutoff):
+            self._resolve_topics([review['question_id'] for review in page])
+
+            for review in page:
+                topic_id = self.question_topics.get(review['question_id'])
+                if topic_id is None:
+                    continue
+                seconds = review.get(self.time_column) or 0
+                correct = 1 if review['is_correct'] else 0
+
+                delta = user_deltas.setdefault((review['user_id'], topic_id), [0, 0, 0, None])
+                delta[0] += 1
+                delta[1] += correct
+                delta[2] += seconds
+                delta[3] = _later(delta[3], review['reviewed_at'])
+
+                topic_delta = topic_deltas.setdefault(topic_id, [0, 0, 0, None])
+                topic_delta[0] += 1
+                topic_delta[1] += correct
+                topic_delta[2] += seconds
+
+            processed += len(page)
+            watermark = (page[-1]['ingested_at'], page[-1]['id'])
+
+            if len(user_deltas) >= self.flush_threshold:
+                self._flush(user_deltas, topic_deltas, flushed, watermark)
+                flushed = watermark
+                user_deltas.clear()
+                topic_deltas.clear()
+                print(f"✓ Folded {processed} reviews (watermark {watermark[0]})")
+
+        if watermark != flushed:
+            self._flush(user_deltas, topic_deltas, flushed, watermark)
+
+        return processed
+
+    def _refresh_mastery(self) -> int:
+        """Copy mastery scores into user snapshots and rebuild per-topic distributions."""
+        distributions: Dict[str, List[int]] = {}
+        last_key = None
+
+        while True:
+            query = self.client.table('user_topic_state').select('user_id, topic_id, mastery_score')
+            if last_key:
+                query = _after(query, ('user_id', 'topic_id'), last_key)
+            page = query.order('user_id,topic_id').limit(self.page_size).execute().data
+
+            rows = []
+            for state in page:
+                distribution = distributions.setdefault(state['topic_id'], [0] * MASTERY_BUCKETS)
+                distribution[mastery_bucket(state['mastery_score'])] += 1
+                rows.append({
+                    'user_id': state['user_id'],
+                    'topic_id': state['topic_id'],
+                    'mastery_score': state['mastery_score']
+                })
+            if rows:
+                self.client.table('user_stats_snapshot').upsert(rows).execute()
+
+            if len(page) < self.page_size:
+                break
+            last_key = (page[-1]['user_id'], page[-1]['topic_id'])
+
+        if distributions:
+            now = datetime.now(timezone.utc).isoformat()
+            self.client.table('topic_stats_snapshot').upsert([
+                {
+                    'topic_id': topic_id,
+                    'learners': sum(distribution),
+                    'mastery_distribution': distribution,
+                    'updated_at': now
+                }
+                for topic_id, distribution in distributions.items()
+            ]).execute()
+
+        return sum(sum(distribution) for distribution in distributions.values())
+
+    def run(self, full: bool = False) -> Dict[str, int]:
+        """Run the job. With full=True, snapshots are dropped and rebuilt from all reviews."""
+        if full:
+            self._reset()
+            watermark = None
+        else:
+            watermark = self._load_watermark()
+
+        reviews = self._fold_reviews(watermark)
+        learners = self._refresh_mastery()
+        return {'reviews': reviews, 'learner_topics': learners}
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Materialize statistics snapshots for the stats page')
+    parser.add_argument('--full', action='store_true', help='Drop snapshots and rebuild from all reviews')
+    parser.add_argument('--page-size', type=int, default=1000, help='Rows per streamed page (default: 1000)')
+    parser.add_argument(
+        '--flush-threshold',
+        type=int,
+        default=20000,
+        help='User/topic pairs held in memory before merging into snapshots (default: 20000)'
+    )
+    parser.add_argument(
+        '--safety-lag',
+        type=float,
+        default=DEFAULT_SAFETY_LAG,
+        help=f'Only fold reviews ingested at least this many seconds ago (default: {DEFAULT_SAFETY_LAG:.0f})'
+    )
+    parser.add_argument(
+        '--time-column',
+        type=str,
+        default='time_taken_seconds',
+        help='reviews column holding seconds per answer (default: time_taken_seconds)'
+    )
+    args = parser.parse_args()
+
+    from uploader import SupabaseUploader
+
+    print("=" * 60)
+    print(f"STATS SNAPSHOT - {'full rebuild' if args.full else 'incremental'}")
+    print("=" * 60)
+
+    start_time = time.time()
+    job = StatsSnapshotJob(SupabaseUploader().client, args.page_size, args.flush_threshold, args.time_column,
+                           safety_lag=args.safety_lag)
+    result = job.run(full=args.full)
+
+    print(f"\n✓ Folded {result['reviews']} reviews, {result['learner_topics']} learner/topic states")
+    print(f"  Time: {time.time() - start_time:.2f}s")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
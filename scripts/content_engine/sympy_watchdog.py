@@ -0,0 +1,203 @@
+"""
+Symbolic Watchdog - Run per-question SymPy work under a compute budget.
+
+A single pathological expression (e.g. a deeply nested composition fed to
+sp.simplify) can hang a whole generate_batch. The watchdog runs symbolic work
+in a separate worker process that is killed when it exceeds its wall-clock
+budget, and records the offending inputs in a quarantine list.
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import signal
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import sympy as sp
+
+from compute_budget import DEFAULT_QUESTION_TIMEOUT, DEFAULT_MAX_OPS
+
+
+DEFAULT_QUARANTINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quarantine.jsonl')
+WORKER_START_TIMEOUT = 60.0
+
+# Workers are (re)started from inside multithreaded processes such as the
+# daemon. A plain fork could copy a lock held by another thread (import lock,
+# stdout) into the child and deadlock it, which would then be quarantined as
+# a timeout. The forkserver is single-threaded and keeps the main module and
+# SymPy preloaded, so restarts stay cheap; platforms without it fall back to spawn.
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    _CONTEXT = multiprocessing.get_context('forkserver')
+    _CONTEXT.set_forkserver_preload(['__main__', 'sympy_watchdog'])
+else:
+    _CONTEXT = multiprocessing.get_context('spawn')
+
+
+class BudgetExceeded(Exception):
+    """Raised when symbolic work exceeds its wall-clock budget."""
+
+
+def within_op_budget(expr: sp.Expr, max_ops: int = DEFAULT_MAX_OPS) -> bool:
+    """Check whether an expression is cheap enough to hand to sp.simplify."""
+    try:
+        return sp.count_ops(expr) <= max_ops
+    except Exception:
+        return False
+
+
+def _worker_loop(conn):
+    """Worker process: execute (func, args) jobs and send back results."""
+    # Ctrl-C is handled by the parent, which shuts the worker down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+
+        if job is None:
+            return
+
+        if isinstance(job, str):
+            # Warm-up: import the module the caller's jobs come from
+            try:
+                importlib.import_module(job)
+            except Exception as e:
+                conn.send(('error', RuntimeError(f"{type(e).__name__}: {e}"), None))
+            else:
+                conn.send(('ok', None, None))
+            continue
+
+        # The worker continues the caller's random stream so seeded
+        # generation produces the same questions as an in-process run.
+        func, args, random_state = job
+        random.setstate(random_state)
+        try:
+            result = func(*args)
+        except Exception as e:
+            # Ship the exception itself so the caller sees the original type
+            try:
+                pickle.loads(pickle.dumps(e))
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            conn.send(('error', e, random.getstate()))
+        else:
+            conn.send(('ok', result, random.getstate()))
+
+
+class SymbolicWatchdog:
+    """
+    Runs callables in a killable worker process with a wall-clock budget.
+    The worker is kept warm between calls and restarted after a timeout.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_QUESTION_TIMEOUT,
+                 quarantine_path: Optional[str] = DEFAULT_QUARANTINE_PATH):
+        self.timeout = timeout
+        self.quarantine_path = quarantine_path
+        self.quarantine: List[Dict[str, Any]] = []
+        self._process = None
+        self._conn = None
+
+    def _start_worker(self, module: str):
+        """Start a worker and import module in it, outside the per-call budget."""
+        # Only child_conn is passed to the worker, so it sees EOF if the parent dies
+        parent_conn, child_conn = _CONTEXT.Pipe()
+        process = _CONTEXT.Process(target=_worker_loop, args=(child_conn,), daemon=True)
+        try:
+            process.start()
+        except BaseException:
+            parent_conn.close()
+            raise
+        finally:
+            child_conn.close()
+        self._process = process
+        self._conn = parent_conn
+
+        try:
+            self._conn.send(module)
+            if not self._conn.poll(WORKER_START_TIMEOUT):
+                raise RuntimeError(f"worker did not import {module} within {WORKER_START_TIMEOUT:.0f}s")
+            status, payload, _ = self._conn.recv()
+        except (EOFError, OSError) as e:
+            status, payload = 'error', RuntimeError(f"worker died while starting: {e}")
+        except RuntimeError:
+            self._kill_worker()
+            raise
+        if status == 'error':
+            self._kill_worker()
+            raise payload
+
+    def _kill_worker(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def run(self, func: Callable, *args) -> Any:
+        """
+        Run func(*args) in the worker process.
+        func and args must be picklable. Raises BudgetExceeded on timeout.
+        """
+        if self._process is None or not self._process.is_alive():
+            self._kill_worker()
+            self._start_worker(getattr(func, '__module__', None) or __name__)
+
+        start_time = time.time()
+        try:
+            self._conn.send((func, args, random.getstate()))
+            finished = self._conn.poll(self.timeout)
+            status, payload, random_state = self._conn.recv() if finished else (None, None, None)
+        except (EOFError, OSError) as e:
+            self._kill_worker()
+            self._record(func, args, f"worker died: {e}", time.time() - start_time)
+            raise BudgetExceeded(f"{getattr(func, '__name__', func)} worker died: {e}")
+
+        if not finished:
+            self._kill_worker()
+            self._record(func, args, 'timeout', time.time() - start_time)
+            raise BudgetExceeded(f"{getattr(func, '__name__', func)} exceeded {self.timeout:.1f}s budget")
+
+        random.setstate(random_state)
+
+        if status == 'error':
+            raise payload
+
+        return payload
+
+    def _record(self, func: Callable, args: tuple, reason: str, elapsed: float):
+        """Add an entry to the quarantine list (and file, if configured)."""
+        entry = {
+            'task': getattr(func, '__name__', str(func)),
+            'expressions': [str(arg) for arg in args if isinstance(arg, sp.Basic)],
+            'reason': reason,
+            'elapsed_seconds': round(elapsed, 3),
+            'recorded_at': datetime.now(timezone.utc).isoformat()
+        }
+        self.quarantine.append(entry)
+        print(f"⚠ Quarantined {entry['task']}({', '.join(entry['expressions'])}): {reason}")
+
+        if self.quarantine_path:
+            try:
+                with open(self.quarantine_path, 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+            except OSError as e:
+                print(f"Could not write quarantine file: {e}")
+
+    def close(self):
+        """Shut down the worker process."""
+        if self._conn is not None and self._process is not None and self._process.is_alive():
+            try:
+                self._conn.send(None)
+                self._process.join(timeout=1)
+            except (OSError, BrokenPipeError):
+                pass
+        self._kill_worker()
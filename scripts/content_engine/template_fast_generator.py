@@ -8,8 +8,9 @@ Speed: ~100 questions/second (vs 1 question/second with LLM).
 import random
 import sympy as sp
 from sympy import symbols, sin, cos, tan, exp, log, diff, latex
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Callable, Optional
 import hashlib
+from sympy_watchdog import SymbolicWatchdog, BudgetExceeded, within_op_budget, DEFAULT_QUESTION_TIMEOUT, DEFAULT_MAX_OPS
 
 
 class TemplateFastGenerator:
@@ -18,8 +19,10 @@ class TemplateFastGenerator:
     Designed for bulk generation of 10K+ questions.
     """
     
-    def __init__(self):
+    def __init__(self, question_timeout: float = DEFAULT_QUESTION_TIMEOUT, max_ops: int = DEFAULT_MAX_OPS):
         self.x = symbols('x')
+        self.max_ops = max_ops
+        self.watchdog = SymbolicWatchdog(timeout=question_timeout)
         
         # Pre-defined solution templates by topic
         self.templates = {
@@ -48,6 +51,12 @@ class TemplateFastGenerator:
             ]
         }
     
+    def __getstate__(self):
+        # Only the symbolic state is shipped to the watchdog worker
+        state = self.__dict__.copy()
+        state.pop('watchdog', None)
+        return state
+    
     def _generate_random_function(self, topic: str, variation: int = 0) -> sp.Expr:
         """
         Generate random function with controlled variation.
@@ -107,6 +116,8 @@ class TemplateFastGenerator:
         candidates = [missing_chain, sign_error, missing_factor, extra_derivative]
         
         for candidate in candidates:
+            if not within_op_budget(candidate, self.max_ops):
+                continue
             simplified = sp.simplify(candidate)
             if simplified != correct and simplified not in distractors:
                 distractors.append(simplified)
@@ -122,6 +133,26 @@ class TemplateFastGenerator:
         
         return distractors[:3]
     
+    def _cheap_distractors(self, correct: sp.Expr) -> List[sp.Expr]:
+        """Fallback distractors that need no simplification"""
+        distractors = []
+        
+        for candidate in [-correct, correct + 1, 2*correct, correct + self.x, correct - 2]:
+            if candidate != correct and candidate not in distractors:
+                distractors.append(candidate)
+        
+        return distractors[:3]
+    
+    def _solve(self, function: sp.Expr) -> Tuple[sp.Expr, List[sp.Expr]]:
+        """Full symbolic work for a question (runs inside the watchdog)"""
+        derivative = self._compute_derivative(function)
+        return derivative, self._generate_distractors(derivative, function)
+    
+    def _solve_cheap(self, function: sp.Expr) -> Tuple[sp.Expr, List[sp.Expr]]:
+        """Unsimplified derivative with cheap distractors, used after a timeout"""
+        derivative = diff(function, self.x)
+        return derivative, self._cheap_distractors(derivative)
+    
     def _format_solution_steps(self, topic: str, original: sp.Expr, derivative: sp.Expr) -> List[str]:
         """Format pre-defined templates with actual expressions"""
         topic_key = 'chain_rule' if 'chain' in topic.lower() else \
@@ -139,8 +170,13 @@ class TemplateFastGenerator:
     def generate_question(self, topic: str, variation: int = 0) -> Dict[str, Any]:
         """Generate a single verified question using templates"""
         function = self._generate_random_function(topic, variation)
-        derivative = self._compute_derivative(function)
-        distractors = self._generate_distractors(derivative, function)
+        
+        try:
+            derivative, distractors = self.watchdog.run(self._solve, function)
+        except BudgetExceeded:
+            # Falls through to the caller if the cheap strategy also times out
+            derivative, distractors = self.watchdog.run(self._solve_cheap, function)
+        
         solution_steps = self._format_solution_steps(topic, function, derivative)
         
         # Build options
@@ -164,12 +200,14 @@ class TemplateFastGenerator:
         content = {
             "statement": f"Find the derivative of $$f(x) = {latex(function)}$$",
             "options": options,
-            "solution_steps": solution_steps
+            "solution_steps": solution_steps,
+            "answer_expr": str(derivative)
         }
         
         return content
     
-    def generate_batch(self, topic: str, count: int) -> List[Dict[str, Any]]:
+    def generate_batch(self, topic: str, count: int,
+                       progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
         """Generate large batch of questions efficiently"""
         questions = []
         
@@ -181,8 +219,14 @@ class TemplateFastGenerator:
                 if (i + 1) % 100 == 0:
                     print(f"Generated {i + 1}/{count} questions")
             
+            except BudgetExceeded as e:
+                print(f"Skipped question {i + 1}: {e}")
+            
             except Exception as e:
                 print(f"Failed to generate question {i + 1}: {e}")
+            
+            if progress_callback:
+                progress_callback(i + 1, len(questions))
         
         return questions
     
@@ -0,0 +1,145 @@
+"""
+Offline tests for llm_pool, using FakeProvider in place of real LLMs.
+
+Usage:
+    python -m unittest test_llm_pool
+"""
+
+import time
+import unittest
+
+from llm_pool import (
+    AllProvidersFailed, CircuitBreaker, FakeProvider, ProviderPool, StepValidationError, parse_solution_steps
+)
+
+
+class ParseSolutionStepsTest(unittest.TestCase):
+
+    def test_accepts_step_array(self):
+        self.assertEqual(parse_solution_steps('["Differentiate", "Simplify"]'), ["Differentiate", "Simplify"])
+
+    def test_accepts_fenced_json(self):
+        self.assertEqual(parse_solution_steps('```json\n["Differentiate"]\n```'), ["Differentiate"])
+
+    def test_rejects_non_array_output(self):
+        for text in ['Sure! First differentiate...', '{"steps": ["a"]}', '"a"', '[]', '[1, 2]', '["a", "  "]',
+                     '[' + ', '.join(['"a"'] * 11) + ']']:
+            with self.subTest(text=text), self.assertRaises(StepValidationError):
+                parse_solution_steps(text)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_opens_and_recovers_through_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.12)
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow(), "only one trial request while half-open")
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+    def test_pool_skips_open_provider_until_it_recovers(self):
+        down = FakeProvider('down', latency=0.0, failure_rate=1.0)
+        pool = ProviderPool([down], failure_threshold=2, reset_timeout=0.1, initial_latency=0.01)
+        try:
+            for _ in range(2):
+                with self.assertRaises(AllProvidersFailed):
+                    pool.generate("q")
+            with self.assertRaisesRegex(AllProvidersFailed, "circuits are open"):
+                pool.generate("q")
+            self.assertEqual(down.calls, 2)
+
+            down.failure_rate = 0.0
+            time.sleep(0.12)
+            self.assertEqual(len(pool.generate("q")), 3)
+            self.assertEqual(pool.stats()['down']['circuit'], 'closed')
+        finally:
+            pool.close()
+
+
+class HedgingTest(unittest.TestCase):
+
+    def test_slow_provider_is_hedged(self):
+        slow = FakeProvider('slow', latency=1.0)
+        fast = FakeProvider('fast', latency=0.01)
+        pool = ProviderPool([slow, fast], hedge_after=0.05, initial_latency=0.1)
+        try:
+            start = time.monotonic()
+            steps = pool.generate("q")
+            self.assertLess(time.monotonic() - start, 0.5)
+            self.assertIn('(fast)', steps[0])
+            self.assertEqual(pool.hedges, 1)
+        finally:
+            pool.close()
+
+    def test_rate_limit_queueing_is_not_hedged(self):
+        # Each request waits ~0.25s for its slot but answers in 0.05s
+        limited = FakeProvider('limited', latency=0.05, requests_per_second=4)
+        backup = FakeProvider('backup', latency=0.05, requests_per_second=4)
+        pool = ProviderPool([limited, backup], hedge_after=0.15, initial_latency=0.05)
+        try:
+            results = pool.map([f"q{i}" for i in range(8)])
+            self.assertTrue(all(results))
+            self.assertEqual(pool.hedges, 0)
+            self.assertEqual(limited.calls + backup.calls, 8)
+        finally:
+            pool.close()
+
+    def test_rate_limited_backup_is_not_started(self):
+        slow = FakeProvider('slow', latency=0.3)
+        backup = FakeProvider('backup', latency=0.01, requests_per_second=0.5)
+        pool = ProviderPool([slow, backup], hedge_after=0.05, initial_latency=0.1)
+        try:
+            pool.members[1].limiter.acquire()
+            self.assertIn('(slow)', pool.generate("q")[0])
+            self.assertEqual((pool.hedges, backup.calls), (0, 0))
+        finally:
+            pool.close()
+
+
+class RoutingTest(unittest.TestCase):
+
+    def test_prefers_faster_provider(self):
+        slow = FakeProvider('slow', latency=0.1)
+        fast = FakeProvider('fast', latency=0.01)
+        pool = ProviderPool([slow, fast], hedge_after=1.0, initial_latency=0.05)
+        try:
+            for _ in range(20):
+                pool.generate("q")
+            self.assertEqual(slow.calls, 1)
+            self.assertEqual(fast.calls, 19)
+        finally:
+            pool.close()
+
+    def test_prefers_healthier_provider(self):
+        flaky = FakeProvider('flaky', latency=0.01, failure_rate=0.5, seed=1)
+        steady = FakeProvider('steady', latency=0.01, seed=2)
+        pool = ProviderPool([flaky, steady], hedge_after=1.0, initial_latency=0.01)
+        try:
+            results = [pool.generate("q") for _ in range(20)]
+            self.assertEqual(len(results), 20)
+            self.assertGreater(steady.calls, 15)
+            self.assertLess(pool.stats()['steady']['error_rate_ewma'], pool.stats()['flaky']['error_rate_ewma'])
+        finally:
+            pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
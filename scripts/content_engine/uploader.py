@@ -13,6 +13,8 @@ class SupabaseUploader:
     def __init__(self):
         load_dotenv()
         
+        self.topic_ids: Dict[str, str] = {}
+        
         self.url = os.getenv('SUPABASE_URL')
         self.service_key = os.getenv('SUPABASE_SECRET_KEY')
         
@@ -41,14 +43,18 @@ class SupabaseUploader:
     def get_or_create_topic(self, topic_name: str) -> str:
         """
         Get existing topic by name or create a new one.
-        Returns the topic UUID.
+        Returns the topic UUID (cached for the lifetime of the uploader).
         """
-        response = self.client.table('topics').select('id').eq('slug', self._slugify(topic_name)).execute()
+        slug = self._slugify(topic_name)
+        if slug in self.topic_ids:
+            return self.topic_ids[slug]
+        
+        response = self.client.table('topics').select('id').eq('slug', slug).execute()
         
         if response.data:
-            return response.data[0]['id']
+            self.topic_ids[slug] = response.data[0]['id']
+            return self.topic_ids[slug]
         
-        slug = self._slugify(topic_name)
         new_topic = {
             'name': topic_name,
             'slug': slug,
@@ -59,7 +65,8 @@ class SupabaseUploader:
         
         if response.data:
             print(f"Created new topic: {topic_name} (id: {response.data[0]['id']})")
-            return response.data[0]['id']
+            self.topic_ids[slug] = response.data[0]['id']
+            return self.topic_ids[slug]
         else:
             raise Exception(f"Failed to create topic: {topic_name}")
     
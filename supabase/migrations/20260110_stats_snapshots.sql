@@ -0,0 +1,174 @@
+-- Materialized statistics snapshots for the stats page
+-- Written by scripts/content_engine/stats_snapshot.py; clients read them in a single query
+
+-- 1. Per-user, per-topic statistics
+CREATE TABLE IF NOT EXISTS user_stats_snapshot (
+    user_id UUID REFERENCES auth.users(id),
+    topic_id UUID REFERENCES topics(id),
+    attempts BIGINT NOT NULL DEFAULT 0,
+    correct BIGINT NOT NULL DEFAULT 0,
+    accuracy FLOAT NOT NULL DEFAULT 0.0,
+    total_time_seconds BIGINT NOT NULL DEFAULT 0,
+    avg_time_seconds FLOAT,
+    mastery_score FLOAT,
+    last_reviewed_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, topic_id)
+);
+
+-- 2. Per-topic statistics across all users
+CREATE TABLE IF NOT EXISTS topic_stats_snapshot (
+    topic_id UUID PRIMARY KEY REFERENCES topics(id),
+    attempts BIGINT NOT NULL DEFAULT 0,
+    correct BIGINT NOT NULL DEFAULT 0,
+    accuracy FLOAT NOT NULL DEFAULT 0.0,
+    total_time_seconds BIGINT NOT NULL DEFAULT 0,
+    avg_time_seconds FLOAT,
+    learners INTEGER NOT NULL DEFAULT 0,
+    -- Learner counts per mastery rating bucket (0-2000 scale, new learners start at 1000):
+    -- [0-400), [400-800), [800-1200), [1200-1600), [1600-2000]
+    mastery_distribution JSONB NOT NULL DEFAULT '[0, 0, 0, 0, 0]',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 3. Incremental job watermarks: last review folded into the snapshots
+CREATE TABLE IF NOT EXISTS stats_watermarks (
+    job TEXT PRIMARY KEY,
+    last_ingested_at TIMESTAMP WITH TIME ZONE,
+    last_review_id UUID,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+-- Earlier revisions of this migration keyed the watermark on reviewed_at
+ALTER TABLE stats_watermarks ADD COLUMN IF NOT EXISTS last_ingested_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE stats_watermarks DROP COLUMN IF EXISTS last_reviewed_at;
+
+-- reviewed_at comes from the device clock (or the inserting transaction's
+-- start), so it cannot order an incremental cursor. ingested_at is always
+-- stamped with the wall clock at insert, whatever the client sends.
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS ingested_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp();
+
+CREATE OR REPLACE FUNCTION set_review_ingested_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.ingested_at = clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_reviews_ingested_at ON reviews;
+CREATE TRIGGER trg_reviews_ingested_at
+    BEFORE INSERT ON reviews
+    FOR EACH ROW
+    EXECUTE FUNCTION set_review_ingested_at();
+
+-- Keyset pagination over reviews in (ingested_at, id) order
+CREATE INDEX IF NOT EXISTS idx_reviews_ingested_at_id ON reviews(ingested_at, id);
+CREATE INDEX IF NOT EXISTS idx_user_stats_snapshot_user_id ON user_stats_snapshot(user_id);
+
+-- Row level security: snapshots are written with the service role key
+ALTER TABLE user_stats_snapshot ENABLE ROW LEVEL SECURITY;
+ALTER TABLE topic_stats_snapshot ENABLE ROW LEVEL SECURITY;
+ALTER TABLE stats_watermarks ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own stats" ON user_stats_snapshot;
+CREATE POLICY "Users can view their own stats" ON user_stats_snapshot
+  FOR SELECT TO authenticated
+  USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Authenticated users can view topic stats" ON topic_stats_snapshot;
+CREATE POLICY "Authenticated users can view topic stats" ON topic_stats_snapshot
+  FOR SELECT TO authenticated
+  USING (true);
+
+-- 4. Merge a batch of review deltas and advance the watermark in one transaction.
+-- The caller passes the watermark it started from; if another run has moved it
+-- since, nothing is applied, so reviews are never counted twice. Returns the
+-- new watermark row.
+DROP FUNCTION IF EXISTS apply_stats_deltas(TEXT, TIMESTAMP WITH TIME ZONE, UUID, TIMESTAMP WITH TIME ZONE, UUID, JSONB, JSONB);
+CREATE OR REPLACE FUNCTION apply_stats_deltas(
+    p_job TEXT,
+    p_expected_ingested_at TIMESTAMP WITH TIME ZONE,
+    p_expected_review_id UUID,
+    p_ingested_at TIMESTAMP WITH TIME ZONE,
+    p_review_id UUID,
+    p_user_deltas JSONB,
+    p_topic_deltas JSONB
+)
+RETURNS SETOF stats_watermarks AS $$
+DECLARE
+    current_watermark stats_watermarks%ROWTYPE;
+BEGIN
+    INSERT INTO stats_watermarks (job) VALUES (p_job) ON CONFLICT (job) DO NOTHING;
+    SELECT * INTO current_watermark FROM stats_watermarks WHERE job = p_job FOR UPDATE;
+
+    IF current_watermark.last_ingested_at IS DISTINCT FROM p_expected_ingested_at
+       OR current_watermark.last_review_id IS DISTINCT FROM p_expected_review_id THEN
+        RAISE EXCEPTION 'Watermark for % moved to (%, %); another run is folding reviews',
+            p_job, current_watermark.last_ingested_at, current_watermark.last_review_id;
+    END IF;
+
+    INSERT INTO user_stats_snapshot AS s (
+        user_id, topic_id, attempts, correct, accuracy,
+        total_time_seconds, avg_time_seconds, last_reviewed_at, updated_at
+    )
+    SELECT d.user_id, d.topic_id, d.attempts, d.correct, d.correct::FLOAT / d.attempts,
+           d.total_time_seconds, d.total_time_seconds::FLOAT / d.attempts, d.last_reviewed_at, NOW()
+    FROM jsonb_to_recordset(p_user_deltas) AS d(
+        user_id UUID, topic_id UUID, attempts BIGINT, correct BIGINT,
+        total_time_seconds BIGINT, last_reviewed_at TIMESTAMP WITH TIME ZONE
+    )
+    ON CONFLICT (user_id, topic_id) DO UPDATE SET
+        attempts = s.attempts + EXCLUDED.attempts,
+        correct = s.correct + EXCLUDED.correct,
+        accuracy = (s.correct + EXCLUDED.correct)::FLOAT / (s.attempts + EXCLUDED.attempts),
+        total_time_seconds = s.total_time_seconds + EXCLUDED.total_time_seconds,
+        avg_time_seconds = (s.total_time_seconds + EXCLUDED.total_time_seconds)::FLOAT / (s.attempts + EXCLUDED.attempts),
+        last_reviewed_at = GREATEST(s.last_reviewed_at, EXCLUDED.last_reviewed_at),
+        updated_at = NOW();
+
+    INSERT INTO topic_stats_snapshot AS s (
+        topic_id, attempts, correct, accuracy, total_time_seconds, avg_time_seconds, updated_at
+    )
+    SELECT d.topic_id, d.attempts, d.correct, d.correct::FLOAT / d.attempts,
+           d.total_time_seconds, d.total_time_seconds::FLOAT / d.attempts, NOW()
+    FROM jsonb_to_recordset(p_topic_deltas) AS d(
+        topic_id UUID, attempts BIGINT, correct BIGINT, total_time_seconds BIGINT
+    )
+    ON CONFLICT (topic_id) DO UPDATE SET
+        attempts = s.attempts + EXCLUDED.attempts,
+        correct = s.correct + EXCLUDED.correct,
+        accuracy = (s.correct + EXCLUDED.correct)::FLOAT / (s.attempts + EXCLUDED.attempts),
+        total_time_seconds = s.total_time_seconds + EXCLUDED.total_time_seconds,
+        avg_time_seconds = (s.total_time_seconds + EXCLUDED.total_time_seconds)::FLOAT / (s.attempts + EXCLUDED.attempts),
+        updated_at = NOW();
+
+    RETURN QUERY
+    UPDATE stats_watermarks
+    SET last_ingested_at = p_ingested_at, last_review_id = p_review_id, updated_at = NOW()
+    WHERE job = p_job
+    RETURNING *;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 5. Drop all snapshot rows and the watermark in one transaction (full rebuild)
+CREATE OR REPLACE FUNCTION reset_stats_snapshots(p_job TEXT)
+RETURNS SETOF stats_watermarks AS $$
+BEGIN
+    INSERT INTO stats_watermarks (job) VALUES (p_job) ON CONFLICT (job) DO NOTHING;
+    PERFORM 1 FROM stats_watermarks WHERE job = p_job FOR UPDATE;
+
+    DELETE FROM user_stats_snapshot WHERE TRUE;
+    DELETE FROM topic_stats_snapshot WHERE TRUE;
+    RETURN QUERY
+    UPDATE stats_watermarks
+    SET last_ingested_at = NULL, last_review_id = NULL, updated_at = NOW()
+    WHERE job = p_job
+    RETURNING *;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the service role (the snapshot job) may write snapshots
+REVOKE EXECUTE ON FUNCTION apply_stats_deltas(TEXT, TIMESTAMP WITH TIME ZONE, UUID, TIMESTAMP WITH TIME ZONE, UUID, JSONB, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION reset_stats_snapshots(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION apply_stats_deltas(TEXT, TIMESTAMP WITH TIME ZONE, UUID, TIMESTAMP WITH TIME ZONE, UUID, JSONB, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION reset_stats_snapshots(TEXT) TO service_role;